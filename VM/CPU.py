@@ -1,6 +1,6 @@
 from .Memory import Memory
 from .Registers import Reg32, Sreg
-from .util import CPU
+from .util import CPU, _finalize_instructions
 from .FPU import FPU
 
 eax, ecx, edx, ebx, esp, ebp, esi, edi = range(8)
@@ -44,22 +44,33 @@ class CPU32(CPU):
         self.reg.ebp = self.mem.size - 1
 
     def stack_push(self, value: int) -> None:
-        old_esp = self.reg.get(esp, self.stack_address_size)
-        new_esp = old_esp - self.operand_size
+        sz = self.operand_size
+
+        if self.stack_address_size == 4:
+            new_esp = self.reg.u32[esp] - sz
+        else:
+            new_esp = self.reg.get(esp, self.stack_address_size) - sz
 
         if new_esp < self.mem.program_break:
             raise RuntimeError(f"The stack cannot grow larger than {self.mem.program_break}")
 
-        self.mem.set(new_esp, self.operand_size, value)
-        self.reg.set(esp, self.stack_address_size, new_esp)
+        self.mem.set(new_esp, sz, value)
+
+        if self.stack_address_size == 4:
+            self.reg.u32[esp] = new_esp
+        else:
+            self.reg.set(esp, self.stack_address_size, new_esp)
 
     def stack_pop(self, size: int) -> int:
         # TODO: check if stack is empty?
-        old_esp = self.reg.get(esp, self.stack_address_size)
-
-        data = self.mem.get(old_esp, size)
-        new_esp = old_esp + size
-        self.reg.set(esp, self.stack_address_size, new_esp)
+        if self.stack_address_size == 4:
+            old_esp = self.reg.u32[esp]
+            data = self.mem.get(old_esp, size)
+            self.reg.u32[esp] = old_esp + size
+        else:
+            old_esp = self.reg.get(esp, self.stack_address_size)
+            data = self.mem.get(old_esp, size)
+            self.reg.set(esp, self.stack_address_size, old_esp + size)
 
         return data
 
@@ -67,4 +78,6 @@ class CPU32(CPU):
 # This line MUST be here for the instructions to be loaded correctly
 # Even more, it MUST be down here, after the definition of the class CPU, so that
 # instructions could import this class for use in annotations
-from . import instructions
\ No newline at end of file
+from . import instructions
+
+_finalize_instructions()
@@ -8,8 +8,10 @@ __all__ = 'ELF32',
 class ELF32:
     def __init__(self, fname: str):
         self.fname = fname
-        self.file = open(self.fname, 'rb')
-        self.hdr = ELF32_Ehdr(self.file)
+        with open(self.fname, 'rb') as file:
+            # all the structures are parsed straight from this buffer, without intermediate copies
+            self.data = memoryview(file.read())
+        self.hdr = ELF32_Ehdr.from_buffer(self.data)
         
         ident = self.hdr.e_ident
         
@@ -28,14 +30,13 @@ class ELF32:
         self.close()
         
     def close(self):
-        self.file.close()
+        self.data = None
         
     @property
     def phdrs(self):
         if self.__phdrs is not None:
             return self.__phdrs
             
-        self.file.seek(self.hdr.e_phoff)
-        self.__phdrs = [ELF32_Phdr(self.file) for _ in range(self.hdr.e_phnum)]
+        self.__phdrs = ELF32_Phdr.parse_array(self.data, self.hdr.e_phoff, self.hdr.e_phnum)
         
         return self.__phdrs
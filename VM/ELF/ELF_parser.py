@@ -6,107 +6,128 @@ class ELF_meta(type):
     def __new__(cls, name, bases, dict):
         if '__annotations__' not in dict:
             return super().__new__(cls, name, bases, dict)
-            
-        layouts = {}
-        current_entries = []
-        current_layout = ''
+
+        # Nested parsers are inlined, so that every class is parsed with a single `struct.Struct`
+        layout = '<'
+        fields = []  # (name, nested parser or None, offset of the nested parser)
         for entry, annot in dict['__annotations__'].items():
             if isinstance(annot, cls):
-                if current_layout:
-                    layouts[tuple(current_entries)] = current_layout
-                    current_entries, current_layout = [], ''
-                layouts[('_' + entry, )] = annot
+                fields.append(('_' + entry, annot, struct.calcsize(layout)))
+                layout += annot._layout[1:]
             elif isinstance(annot, str):
-                current_entries.append('_' + entry)
-                current_layout += annot
+                fields.append(('_' + entry, None, 0))
+                layout += annot
             else:
                 raise ValueError(f'Unexpected type in annotation for {name}.{entry}: {annot!r} of type {type(annot)}')
-            
+
             try:
                 converter = dict[entry]  # must be a function of one argument
                 if not hasattr(converter, '__call__'):
                     raise ValueError(f'Converter for entry {name}.{entry} must be callable (got {converter!r})')
             except KeyError:
                 converter = lambda x: x
-                
+
             dict[entry] = property(lambda self, e=entry, c=converter: c(self.__getattribute__('_' + e)))
             dict['_' + entry] = 0
-        
-        if current_layout:
-            layouts[tuple(current_entries)] = current_layout
-        
-        dict['_layouts'] = {
-            key: (
-                struct.Struct(value)
-                if isinstance(value, str) else value
-                )
-            for key, value in layouts.items()
-            }
-        dict['size'] = sum(
-            val.size
-            for val in dict['_layouts'].values()
-            )
+
+        dict['_layout'] = layout
+        dict['_struct'] = struct.Struct(layout)
+        dict['_fields'] = tuple(fields)
+        dict['size'] = dict['_struct'].size
         dict['_name'] = name
-        
+
         def __init__(self, stream):
-            self.__RAW = b''
-            for entries, parser in self._layouts.items():
-                if isinstance(parser, struct.Struct):
-                    _raw = stream.read(parser.size)
-                    parsed = parser.unpack(_raw)
-                    self.__RAW += _raw
+            raw = stream.read(self.size)
+            self._load(self._struct.unpack(raw), 0, raw, 0)
+
+        @classmethod
+        def from_buffer(cls, buf, offset=0):
+            """
+            Parse an instance from any object supporting the buffer protocol without copying it.
+            :param buf: The buffer to parse.
+            :param offset: The offset of the structure within `buf`.
+            :return: The parsed instance.
+            """
+            self = cls.__new__(cls)
+            self._load(cls._struct.unpack_from(buf, offset), 0, buf, offset)
+
+            return self
+
+        @classmethod
+        def parse_array(cls, buf, offset, count):
+            """
+            Parse `count` consecutive instances from `buf` with a single `struct.iter_unpack` call.
+            :param buf: The buffer to parse.
+            :param offset: The offset of the first structure within `buf`.
+            :param count: The number of structures to parse.
+            :return: The list of parsed instances.
+            """
+            size = cls.size
+            ret = []
+            for values in cls._struct.iter_unpack(memoryview(buf)[offset:offset + count * size]):
+                self = cls.__new__(cls)
+                self._load(values, 0, buf, offset)
+                ret.append(self)
+                offset += size
+
+            return ret
+
+        def _load(self, values, index, buf, offset):
+            for name, parser, field_offset in self._fields:
+                if parser is None:
+                    setattr(self, name, values[index])
+                    index += 1
                 else:
-                    parsed = parser(stream),
-                    self.__RAW += parsed[0].__RAW
-                    
-                for name, value in zip(entries, parsed):
-                    assert name.startswith('_')
-                    setattr(self, name, value)
-                
+                    nested = parser.__new__(parser)
+                    index = nested._load(values, index, buf, offset + field_offset)
+                    setattr(self, name, nested)
+
+            self.__buf, self.__offset = buf, offset
             self.__repr = None
-            self.__len = len(self.__RAW)
-                
+
+            return index
+
         def __repr__(self):
             if self.__repr is None:
                 ret = self._name + ' {\n'
-                for entries, parser in self._layouts.items():
-                    if isinstance(parser, struct.Struct):
-                        for name in entries:
-                            data = self.__getattribute__(name[1:])
-                            if isinstance(data, bytes):
-                                data = '0x' + data.hex()
-                            ret += f'\t{name[1:]} = {data},\n'
+                for name, parser, _ in self._fields:
+                    if parser is None:
+                        data = self.__getattribute__(name[1:])
+                        if isinstance(data, bytes):
+                            data = '0x' + data.hex()
+                        ret += f'\t{name[1:]} = {data},\n'
                     else:
-                        for name in entries:
-                            data = self.__getattribute__(name)
-                            lines = repr(data).splitlines()
-                            data = lines[0] + '\n' + '\n'.join('\t' + s for s in lines[1:])
-                            ret += f'\t{name[1:]} = {data},\n'
+                        data = self.__getattribute__(name)
+                        lines = repr(data).splitlines()
+                        data = lines[0] + '\n' + '\n'.join('\t' + s for s in lines[1:])
+                        ret += f'\t{name[1:]} = {data},\n'
                 self.__repr = ret + '}'
             return self.__repr
-            
+
         def __bytes__(self):
-            return self.__RAW
-            
+            return bytes(self.__buf[self.__offset:self.__offset + self.size])
+
         def __eq__(self, other):
-            return self.__RAW == other.__RAW
-            
+            return bytes(self) == bytes(other)
+
         def __hash__(self):
-            return hash(self.__RAW)
-            
+            return hash(bytes(self))
+
         def __len__(self):
-            return self.__len
-                
+            return self.size
+
         dict['__init__'] = __init__
+        dict['from_buffer'] = from_buffer
+        dict['parse_array'] = parse_array
+        dict['_load'] = _load
         dict['__repr__'] = __repr__
         dict['__bytes__'] = __bytes__
         dict['__eq__'] = __eq__
         dict['__hash__'] = __hash__
         dict['__len__'] = __len__
-            
+
         return super().__new__(cls, name, bases, dict)
 
 
 class ELF_parser(metaclass=ELF_meta):
     ...
-
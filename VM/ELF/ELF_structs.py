@@ -59,10 +59,31 @@ class ELF32_Shdr(ELF_parser):
     sh_entsize  : 'I'
     
     
+def _st_info_str(info: int) -> str:
+    return str(enums.st_bind(info >> 4)) + '|' + str(enums.st_type(info & 0xF))
+
+
+# Building enum members for every symbol is slow, so the names of all the valid `st_info` bytes are built once
+_ST_INFO_STR = {}
+for _info in range(256):
+    try:
+        _ST_INFO_STR[_info] = _st_info_str(_info)
+    except (ValueError, TypeError):
+        ...  # not a valid combination, will raise when accessed
+del _info
+
+
+def st_info_str(info: int) -> str:
+    try:
+        return _ST_INFO_STR[info]
+    except KeyError:
+        return _st_info_str(info)
+
+
 class ELF32_Sym(ELF_parser):
     st_name: 'I'
     st_value: 'I'
     st_size: 'I'
-    st_info: 'B' = lambda x: str(enums.st_bind(x>>4)) + '|' + str(enums.st_type(x & 0xF))
+    st_info: 'B' = st_info_str
     st_other: 'B'
     st_shndex: 'H'
@@ -2,6 +2,16 @@ from ELF import ELF32_Ehdr, ELF32_Shdr, ELF32_Phdr, ELF32_Sym
 from enums import EI_CLASS, EI_DATA, e_machine, p_type
 
 
+def get_name(names: bytes, offset: int) -> str:
+    """
+    Read the NUL-terminated name at `offset` in the string table `names`.
+    Unlike splitting `names[offset:]`, this doesn't copy the rest of the table, which is quadratic in the number of names.
+    """
+    end = names.find(b'\0', offset)
+
+    return names[offset:end if end >= 0 else None].decode()
+
+
 class ELF32:
     def __init__(self, fname: str):
         self.fname = fname
@@ -35,14 +45,15 @@ class ELF32:
     def sections(self):
         if self.__sections is None:
             self.file.seek(self.hdr.e_shoff)
-            sections = [ELF32_Shdr(self.file) for _ in range(self.hdr.e_shnum)]
+            data = self.file.read(self.hdr.e_shnum * ELF32_Shdr.size)
+            sections = ELF32_Shdr.parse_array(data, 0, self.hdr.e_shnum)
     
             shstrndx = sections[self.hdr.e_shstrndx]
             self.file.seek(shstrndx.sh_offset)
             names = self.file.read(shstrndx.sh_size)
         
             self.__sections = {
-                names[section.sh_name:].split(b'\0', 1)[0].decode():
+                get_name(names, section.sh_name):
                     section
                 for section in sections[1:]
             }
@@ -55,7 +66,8 @@ class ELF32:
             return self.__phdrs
             
         self.file.seek(self.hdr.e_phoff)
-        self.__phdrs = [ELF32_Phdr(self.file) for _ in range(self.hdr.e_phnum)]
+        data = self.file.read(self.hdr.e_phnum * ELF32_Phdr.size)
+        self.__phdrs = ELF32_Phdr.parse_array(data, 0, self.hdr.e_phnum)
         
         return self.__phdrs
         
@@ -73,13 +85,13 @@ class ELF32:
         self.file.seek(sec_dynsym.sh_offset)
         num = sec_dynsym.sh_size // sec_dynsym.sh_entsize
         
-        dynsyms = [ELF32_Sym(self.file) for _ in range(num)]
+        dynsyms = ELF32_Sym.parse_array(self.file.read(num * ELF32_Sym.size), 0, num)
         
         self.file.seek(sec_dynstr.sh_offset)
         names = self.file.read(sec_dynstr.sh_size)
         
         self.__dynsym = {
-                names[sym.st_name:].split(b'\0', 1)[0].decode():
+                get_name(names, sym.st_name):
                     sym
                 for sym in dynsyms
             }
@@ -100,13 +112,13 @@ class ELF32:
         self.file.seek(sec_symtab.sh_offset)
         num = sec_symtab.sh_size // sec_symtab.sh_entsize
         
-        symbols = [ELF32_Sym(self.file) for _ in range(num)]
+        symbols = ELF32_Sym.parse_array(self.file.read(num * ELF32_Sym.size), 0, num)
         
         self.file.seek(sec_strtab.sh_offset)
         names = self.file.read(sec_strtab.sh_size)
         
         self.__symtab = {
-                names[sym.st_name:].split(b'\0', 1)[0].decode():
+                get_name(names, sym.st_name):
                     sym
                 for sym in symbols
             }
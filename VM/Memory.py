@@ -1,39 +1,39 @@
-from ctypes import addressof, pointer, memmove, memset, string_at
+from ctypes import addressof, pointer, memmove, memset
+from struct import Struct
 
-from .ctypes_types import ubyte, uword, udword, uqword
+from .ctypes_types import ubyte, uword, udword
 from .FPU import flt, dbl, binary80
+from .util import SIGNED8
 
 __all__ = 'Memory',
 
+# precompiled unpackers indexed by operand size; 1-byte reads index the array directly
+unpack_unsigned = [None, None, Struct('<H').unpack_from, None, Struct('<I').unpack_from]
+unpack_signed = [None, None, Struct('<h').unpack_from, None, Struct('<i').unpack_from]
+pack_unsigned = [None, None, Struct('<H').pack_into, None, Struct('<I').pack_into]
+pack_float = {4: Struct('<f').pack_into, 8: Struct('<d').pack_into}
+
 
 class Memory:
     types = [None, ubyte, uword, None, udword]
+    float_types = {32: flt, 64: dbl, 80: binary80}
+    float_types_bytes = {4: flt, 8: dbl}
 
     def __init__(self, memsz: int, segment_registers=None):
         self.sreg = segment_registers
 
         self.__size = 0
         self.__segment_override_number = 3  # DS
-        self.mem = self.mem_ptr = None
+        self.buf = self.view = self.mem = self.mem_ptr = None
         self.base = 0
         self.__segment_base = 0
 
         self.size = memsz
-        self.__program_break = 0
+        self.program_break = 0
 
         if segment_registers is not None:
             self.segment_override = self.__segment_override_number
 
-    @property
-    def program_break(self) -> int:
-        return self.__program_break
-
-    @program_break.setter
-    def program_break(self, value: int) -> None:
-        # print(f'Changing program break: 0x{self.__program_break:08x} => 0x{value:08x}')
-
-        self.__program_break = value
-
     @property
     def size(self):
         return self.__size
@@ -42,7 +42,11 @@ class Memory:
     def size(self, memsz: int):
         assert memsz > 0
 
-        self.mem = (ubyte * memsz)()
+        # The memory itself is a `bytearray`, which is the fastest thing to index, slice and `struct.(un)pack` into.
+        # `self.mem` is a ctypes view of the very same buffer for the code that needs raw addresses.
+        self.buf = bytearray(memsz)
+        self.view = memoryview(self.buf)
+        self.mem = (ubyte * memsz).from_buffer(self.buf)
 
         self.base = addressof(self.mem)
         self.mem_ptr = pointer(self.mem)
@@ -104,18 +108,12 @@ class Memory:
 
         assert offset >= 0, f'Invalid memory address: {hex(offset)}'
 
-        if size == 4:
-            ret = self.types[size].from_address(self.base + self.__segment_base + offset).value
+        if size == 1:
+            ret = self.buf[self.__segment_base + offset]
 
-            return ret if not signed else (ret if ret < 2147483648 else ret - 4294967296)
-        elif size == 2:
-            ret = self.types[size].from_address(self.base + self.__segment_base + offset).value
-
-            return ret if not signed else (ret if ret < 32768 else ret - 65536)
-        elif size == 1:
-            ret = self.mem[self.__segment_base + offset]
-
-            return ret if not signed else (ret if ret < 128 else ret - 256)
+            return SIGNED8[ret] if signed else ret
+        elif size == 4 or size == 2:
+            return (unpack_signed if signed else unpack_unsigned)[size](self.buf, self.__segment_base + offset)[0]
 
         raise ValueError(
             f'Memory.get(offset={offset:08x}, size={size}): invalid size, please use Memory.get_bytes instead'
@@ -131,10 +129,34 @@ class Memory:
 
         assert offset >= 0, f'Invalid memory address: {hex(offset)}'
 
-        return bytes(self.mem[self.__segment_base + offset:self.__segment_base + offset + size])
+        return self.view[self.__segment_base + offset:self.__segment_base + offset + size].tobytes()
+
+    def get_view(self, offset: int, size: int) -> memoryview:
+        """
+        Same as `get_bytes`, but returns a view into the memory instead of a copy.
+        The view must not outlive the call that requested it, because the memory may change.
+        """
+        # self.asan(offset, size) -> pasted here for speed
+        if self.__segment_base + offset > self.__size or self.__segment_base + offset + size > self.__size:
+            raise MemoryError(
+                f'Not enough memory (tried to read from address range 0x{offset:08x}-0x{offset + size:08x} '
+                f'({size} bytes), maximum address: 0x{self.size:08x} bytes)'
+            )
+
+        assert offset >= 0, f'Invalid memory address: {hex(offset)}'
+
+        return self.view[self.__segment_base + offset:self.__segment_base + offset + size]
 
     def kernel_read_string(self, offset: int, size=-1) -> bytes:
-        return string_at(self.base + offset, size)
+        if size < 0:
+            # `bytearray.find` scans for the terminator with `memchr` and, unlike `ctypes.string_at`,
+            # cannot run past the end of the guest's memory
+            size = self.buf.find(b'\0', offset) - offset
+
+            if size < 0:
+                raise MemoryError(f'Unterminated string at address 0x{offset:08x}')
+
+        return self.view[offset:offset + size].tobytes()
 
     def get_eip(self, offset: int, size: int, signed=False) -> int:
         # self.asan_raw(offset, size) -> pasted here for speed
@@ -146,20 +168,14 @@ class Memory:
 
         assert offset >= 0, f'Invalid memory address: {hex(offset)}'
 
-        if size == 4:
-            ret = self.types[size].from_address(self.base + offset).value
-
-            return ret if not signed else (ret if ret < 2147483648 else ret - 4294967296)
-        elif size == 2:
-            ret = self.types[size].from_address(self.base + offset).value
+        if size == 1:
+            ret = self.buf[offset]
 
-            return ret if not signed else (ret if ret < 32768 else ret - 65536)
-        elif size == 1:
-            ret = self.mem[offset]
+            return SIGNED8[ret] if signed else ret
+        elif size == 4 or size == 2:
+            return (unpack_signed if signed else unpack_unsigned)[size](self.buf, offset)[0]
 
-            return ret if not signed else (ret if ret < 128 else ret - 256)
-
-        return bytes(self.mem[offset:offset + size])
+        return self.view[offset:offset + size].tobytes()
 
     def get_float(self, offset: int, size: int) -> binary80:
         # self.asan(offset, size) -> pasted here for speed
@@ -171,7 +187,7 @@ class Memory:
 
         assert offset >= 0, f'Invalid memory address: {hex(offset)}'
 
-        orig_float = {32: flt, 64: dbl, 80: binary80}[size].from_address(self.base + self.__segment_base + offset)
+        orig_float = self.float_types[size].from_address(self.base + self.__segment_base + offset)
 
         if size == 80:
             return orig_float
@@ -188,7 +204,7 @@ class Memory:
 
         assert offset >= 0, f'Invalid memory address: {hex(offset)}'
 
-        orig_float = {32: flt, 64: dbl, 80: binary80}[size].from_address(self.base + offset)
+        orig_float = self.float_types[size].from_address(self.base + offset)
 
         if size == 80:
             return orig_float
@@ -221,7 +237,7 @@ class Memory:
         assert offset >= 0, f'Invalid memory address: {hex(offset)}'
 
         addr = self.__segment_base + offset
-        self.mem[addr:addr + size] = val
+        self.view[addr:addr + size] = val
 
     def set(self, offset: int, size: int, val: int) -> None:
         # self.asan(offset, size) -> pasted here for speed
@@ -235,13 +251,11 @@ class Memory:
 
         addr = self.__segment_base + offset
         if size == 4:
-            # faster than byte unpacking with shifts
-            self.mem[addr:addr + 4] = (val & 0xFFFFFFFF).to_bytes(4, 'little')
+            pack_unsigned[4](self.buf, addr, val & 0xFFFFFFFF)
         elif size == 2:
-            # faster than `(val & 0xFFFF).to_bytes(2, 'little')`
-            self.mem[addr:addr + 2] = val & 0xFF, (val >> 8) & 0xFF  # (val & 0xFFFF).to_bytes(2, 'little')
+            pack_unsigned[2](self.buf, addr, val & 0xFFFF)
         elif size == 1:
-            self.mem[addr] = val
+            self.buf[addr] = val & 0xFF
         else:
             raise RuntimeError(f'Memory.set: invalid size: {size} not in (1, 2, 4). Use Memory.set_bytes instead')
 
@@ -255,9 +269,8 @@ class Memory:
 
         assert offset >= 0, f'Invalid memory address: {hex(offset)}'
 
-        converted = {4: flt, 8: dbl}[size](float(val))
-
-        addr = self.__segment_base + offset
+        # round through the ctypes type so that out-of-range values become infinities instead of raising
+        converted = self.float_types_bytes[size](float(val)).value
 
-        self.mem[addr:addr + size] = {4: udword, 8: uqword}[size].from_buffer(converted).value.to_bytes(size, 'little')
+        pack_float[size](self.buf, self.__segment_base + offset, converted)
 
@@ -150,21 +150,21 @@ class Sreg(ctypes.LittleEndianStructure):
         self.__names = 'ES CS SS DS FS GS'.split()
         self.__ptr = ctypes.cast(ctypes.pointer(self), ctypes.POINTER(_one_sreg))
 
-    def set(self, offset: int, segment_selector: int, descriptor_data: bytes) -> None:
+    def set(self, offset: int, segment_selector: int, base: int, limit: int) -> None:
+        """
+        Load a segment register.
+        :param offset: The number of the segment register.
+        :param segment_selector: The visible part of the register.
+        :param base: The base address of the segment taken from its descriptor.
+        :param limit: The limit of the segment taken from its descriptor.
+        """
         # index, TI, RPL = segment_selector >> 3, (segment_selector >> 2) & 1, segment_selector & 0b11
-        # print(f'offset={offset:03b}, (index={index:05b}, TI={TI:1b}, RPL={RPL:02b}), descriptor: {descriptor_data}')
-
-        descriptor = SegmentDescriptor.from_buffer_copy(descriptor_data)
-
-        # print(f'Descriptor: {descriptor}, descr. data=={descriptor_data}')
 
         # TODO: handle priviledge level
 
         self.__ptr[offset].visible = segment_selector
-        self.__ptr[offset].hidden.base = (descriptor.base_3 << 24) | (descriptor.base_2 << 16) | descriptor.base_1
-        self.__ptr[offset].hidden.limit = (descriptor.limit_2 << 16) | descriptor.limit_1
-
-        # print(f'segment.visible={self.__ptr[offset].visible}, segment.hidden.base=0x{self.__ptr[offset].hidden.base:08x}, segment.hidden.limit=0x{self.__ptr[offset].hidden.limit:08x}')
+        self.__ptr[offset].hidden.base = base
+        self.__ptr[offset].hidden.limit = limit
 
     def get(self, offset: int) -> _one_sreg:
         assert 0b000 <= offset <= 0b101
@@ -173,43 +173,38 @@ class Sreg(ctypes.LittleEndianStructure):
 
 
 class Reg32(_Reg32_base):
+    # REG8_INDEX[n] is the byte offset of the n-th 8-bit register (AL, CL, DL, BL, AH, CH, DH, BH)
+    REG8_INDEX = tuple(4 * (offset % 4) + offset // 4 for offset in range(8))
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        ptr = ctypes.pointer(self)
+        # Typed views of the register file: indexing a memoryview is cheaper than going through ctypes pointers.
+        # When the size of an operand is known in advance, index these directly instead of calling `get`/`set`,
+        # e.g. `reg.u32[4]` is ESP and `reg.s32[0]` is EAX interpreted as a signed number.
+        # Note that 8-bit registers must be indexed with `REG8_INDEX` and that values written must be in range.
+        view = memoryview(self).cast('B')
 
-        self.__ptr8 = ctypes.cast(ptr, ctypes.POINTER(ubyte))
-        self.__ptr16 = ctypes.cast(ptr, ctypes.POINTER(uword))
-        self.__ptr32 = ctypes.cast(ptr, ctypes.POINTER(udword))
+        self.u8, self.s8 = view, view.cast('b')
+        self.u16, self.s16 = view.cast('H'), view.cast('h')
+        self.u32, self.s32 = view.cast('I'), view.cast('i')
 
     def get(self, offset: int, size: int, signed=False) -> int:
         if size == 4:
-            if not signed:
-                return self.__ptr32[offset]
-
-            ret = self.__ptr32[offset]
-            return ret if ret < 2147483648 else ret - 4294967296
+            return (self.s32 if signed else self.u32)[offset]
         elif size == 2:
-            if not signed:
-                return self.__ptr16[2 * offset]
-
-            ret = self.__ptr16[2 * offset]
-            return ret if ret < 32768 else ret - 65536
+            return (self.s16 if signed else self.u16)[2 * offset]
         elif size == 1:
-            if not signed:
-                return self.__ptr8[4 * (offset % 4) + offset // 4]
-
-            ret = self.__ptr8[4 * (offset % 4) + offset // 4]
-            return ret if ret < 128 else ret - 256
+            return (self.s8 if signed else self.u8)[self.REG8_INDEX[offset]]
 
         raise ValueError(f'Reg32.get(offset={offset}, size={size}): unexpected size: {size}')
 
     def set(self, offset: int, size: int, value: int) -> None:
         if size == 4:
-            self.__ptr32[offset] = value
+            self.u32[offset] = value & 0xFFFFFFFF
         elif size == 2:
-            self.__ptr16[2 * offset] = value
+            self.u16[2 * offset] = value & 0xFFFF
         elif size == 1:
-            self.__ptr8[4 * (offset % 4) + offset // 4] = value
+            self.u8[self.REG8_INDEX[offset]] = value & 0xFF
         else:
             raise ValueError(f'Reg32.set_val(offset={offset}, size={size}, value={value}): unexpected size: {size}')
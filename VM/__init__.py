@@ -9,7 +9,7 @@ __version__ = 0, 1, 0
 
 
 class VM(CPU32, FetchLoopMixin):
-    __slots__ = 'fmt', 'descriptors', 'GDT', 'running', 'RETCODE', 'kernel'
+    __slots__ = 'fmt', 'descriptors', 'free_descriptors', 'GDT_base', 'GDT_limit', 'GDT_flags', 'GDT_free', 'running', 'RETCODE', 'kernel'
     from .misc import process_ModRM
 
     def __init__(self, memsize: int, stdin=sys.stdin, stdout=sys.stdout, stderr=sys.stderr):
@@ -17,26 +17,35 @@ class VM(CPU32, FetchLoopMixin):
         self.kernel = Kernel(self)
 
         self.descriptors = [stdin, stdout, stderr]
-        self.GDT = [
-            b'\0' * 8  # 64-bit entry
-        ] * 6  # TODO: how many entries are there?
+        self.free_descriptors = []  # heap of the indices of closed descriptors
+        self.GDT_reset()
         self.RETCODE = None
 
+    def GDT_reset(self) -> None:
+        """
+        Mark all the entries of the GDT as not present, so that every program starts with an empty GDT.
+        """
+        # The GDT is stored as parallel lists of the decoded fields of its 64-bit entries
+        GDT_size = 6  # TODO: how many entries are there?
+        self.GDT_base = [0] * GDT_size
+        self.GDT_limit = [0] * GDT_size
+        self.GDT_flags = [0] * GDT_size  # the access byte, the flags (G, DB, L, AVL) in bits 12..15
+        # Indices of the GDT entries that aren't present, the lowest one on top. Entry 0 is the null descriptor.
+        self.GDT_free = list(range(GDT_size - 1, 0, -1))
+
     def interrupt(self, code: int):
         if code == 0x80:  # syscall
-            syscall_number = self.reg.eax
-
-            self.reg.eax = self.kernel[syscall_number]()
+            self.reg.eax = self.kernel.syscall(self.reg.eax)
         else:
             raise RuntimeError(f'Interrupt 0x{code:02x} is not supported yet')
 
 
 class VMKernel(VM, ExecuteELF, ExecuteBytes, ExecuteFlat):
-    def execute(self, strategy: ExecutionStrategy, *args, **kwargs):
-        bases = {
-            ExecutionStrategy.BYTES: ExecuteBytes,
-            ExecutionStrategy.FLAT: ExecuteFlat,
-            ExecutionStrategy.ELF: ExecuteELF
-        }
+    bases = {
+        ExecutionStrategy.BYTES: ExecuteBytes,
+        ExecutionStrategy.FLAT: ExecuteFlat,
+        ExecutionStrategy.ELF: ExecuteELF
+    }
 
-        return bases[strategy].execute(self, *args, **kwargs)
+    def execute(self, strategy: ExecutionStrategy, *args, **kwargs):
+        return self.bases[strategy].execute(self, *args, **kwargs)
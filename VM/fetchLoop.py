@@ -1,15 +1,32 @@
 import enum
 
 from .ELF import ELF32, enums
-from .util import SegmentRegs, MissingOpcodeError
+from .util import MissingOpcodeError, CS, SS, DS, ES, FS, GS
 from .CPU import CPU32
 
 import logging
 logger = logging.getLogger(__name__)
 
+# opcode perfixes
+PREF_SEGMENTS = {
+    0x2E: CS,
+    0x36: SS,
+    0x3E: DS,
+    0x26: ES,
+    0x64: FS,
+    0x65: GS
+}
+PREF_OP_SIZE_OVERRIDE = frozenset({0x66, 0x67})
+PREF_LOCK = frozenset({0xf0})
+PREF_REP = frozenset({0xf3})
+
+PREFIXES = frozenset(PREF_SEGMENTS) | PREF_OP_SIZE_OVERRIDE | PREF_LOCK | PREF_REP
+# indexed by the opcode, so that checking for a prefix is a single index operation instead of hashing
+IS_PREFIX = bytes(opcode in PREFIXES for opcode in range(256))
+
 
 class FetchLoopMixin:
-    _attrs_ = 'eip', 'mem', 'reg.ebx', 'fmt', 'instr', 'sizes', 'default_mode'
+    _attrs_ = 'eip', 'mem', 'reg.ebx', 'fmt', 'instr', 'instr_0F', 'instr_ext', 'sizes', 'default_mode'
 
     def execute_opcode(self: CPU32) -> None:
         self.eip += 1
@@ -22,18 +39,17 @@ class FetchLoopMixin:
             self.opcode = (self.opcode << 8) | op
             off += 1
 
+            impls = self.instr_0F[op]
+        else:
+            impls = self.instr[self.opcode]
+
         if __debug__:
             logger.debug(self.fmt, self.eip - off, self.opcode)
 
-        try:
-            impls = self.instr[self.opcode]
-        except KeyError:
-            ...  # could not find opcode
-        else:
-            for impl in impls:
-                if impl():
-                    return  # opcode executed
-            # could not find suitable implementation
+        for impl in impls:
+            if impl():
+                return  # opcode executed
+        # could not find suitable implementation
 
         # read one more byte
         op = self.mem.get_eip(self.eip, 1)
@@ -42,7 +58,7 @@ class FetchLoopMixin:
         self.opcode = (self.opcode << 8) | op
 
         try:
-            impls = self.instr[self.opcode]
+            impls = self.instr_ext[self.opcode]
         except KeyError:
             raise MissingOpcodeError(f'Opcode {self.opcode:x} is not recognized yet (at 0x{self.eip - off - 1:08x})')
         else:
@@ -61,30 +77,26 @@ class FetchLoopMixin:
         :return: None
         """
 
-        # opcode perfixes
-        pref_segments = {
-            0x2E: SegmentRegs.CS,
-            0x36: SegmentRegs.SS,
-            0x3E: SegmentRegs.DS,
-            0x26: SegmentRegs.ES,
-            0x64: SegmentRegs.FS,
-            0x65: SegmentRegs.GS
-        }
-        pref_op_size_override = {0x66, 0x67}
-        pref_lock = {0xf0}
-        rep = {0xf3}
-
-        prefixes = set(pref_segments) | pref_op_size_override | pref_lock | rep
         self.running = True
 
-        while self.running and self.eip + 1 < self.mem.size:
-            overrides = []
-            self.opcode = self.mem.get(self.eip, 1)
+        # these are looked up once instead of on every instruction
+        mem = self.mem
+        mem_get = mem.get
+        execute_opcode = self.execute_opcode
 
-            while self.opcode in prefixes:
+        while self.running and self.eip + 1 < mem.size:
+            self.opcode = mem_get(self.eip, 1)
+
+            if not IS_PREFIX[self.opcode]:
+                # fast path: most instructions have no prefixes, so there's nothing to apply or undo
+                execute_opcode()
+                continue
+
+            overrides = []
+            while IS_PREFIX[self.opcode]:
                 overrides.append(self.opcode)
                 self.eip += 1
-                self.opcode = self.mem.get(self.eip, 1)
+                self.opcode = mem_get(self.eip, 1)
 
             # apply overrides
             size_override_active = False
@@ -95,35 +107,39 @@ class FetchLoopMixin:
                         size_override_active = True
                     old_operand_size = self.operand_size
                     self.operand_size = self.sizes[self.current_mode]
-                    logger.debug(
-                        'Operand size override: %d -> %d',
-                        old_operand_size, self.operand_size
-                    )
+                    if __debug__:
+                        logger.debug(
+                            'Operand size override: %d -> %d',
+                            old_operand_size, self.operand_size
+                        )
                 elif ov == 0x67:
                     if not size_override_active:
                         self.current_mode = not self.current_mode
                         size_override_active = True
                     old_address_size = self.address_size
                     self.address_size = self.sizes[self.current_mode]
-                    logger.debug(
-                        'Address size override: %d -> %d',
-                        old_address_size, self.address_size
-                    )
-                elif ov in pref_segments:
+                    if __debug__:
+                        logger.debug(
+                            'Address size override: %d -> %d',
+                            old_address_size, self.address_size
+                        )
+                elif ov in PREF_SEGMENTS:
                     is_special = ov >> 6
                     if is_special:
                         sreg_number = 4 + (ov & 1)  # FS or GS
                     else:
                         sreg_number = (ov >> 3) & 0b11
                     self.mem.segment_override = sreg_number
-                    logger.debug('Segment override: %s', self.mem.segment_override)
+                    if __debug__:
+                        logger.debug('Segment override: %s', self.mem.segment_override)
                 elif ov == 0xf0:  # LOCK prefix
-                    logger.debug('LOCK prefix')  # do nothing; all operations are atomic anyway. Right?
+                    if __debug__:
+                        logger.debug('LOCK prefix')  # do nothing; all operations are atomic anyway. Right?
                 elif ov == 0xf3:  # REP prefix
                     self.opcode = ov
                     self.eip -= 1  # repeat the previous opcode
 
-            self.execute_opcode()
+            execute_opcode()
 
             # undo all overrides
             for ov in overrides:
@@ -133,8 +149,8 @@ class FetchLoopMixin:
                 elif ov == 0x67:
                     self.current_mode = self.default_mode
                     self.address_size = self.sizes[self.current_mode]
-                elif ov in pref_segments:
-                    self.mem.segment_override = SegmentRegs.DS
+                elif ov in PREF_SEGMENTS:
+                    self.mem.segment_override = DS
 
         return self.reg.eax
 
@@ -206,9 +222,7 @@ class ExecuteELF(ExecutionMixin):
                     continue
 
                 logger.info(f'LOAD {phdr.p_memsz:10,d} bytes at address 0x{phdr.p_vaddr:09_x}')
-                elf.file.seek(phdr.p_offset)
-
-                data = elf.file.read(phdr.p_filesz)
+                data = elf.data[phdr.p_offset:phdr.p_offset + phdr.p_filesz]
                 self.mem.set_bytes(phdr.p_vaddr, len(data), data)
                 self.mem.set_bytes(phdr.p_vaddr + phdr.p_filesz, phdr.p_memsz - phdr.p_filesz, bytearray(phdr.p_memsz - phdr.p_filesz))
 
@@ -4,13 +4,17 @@ could be registered properly.
 
 The individual implementations are structured in the following way:
     An instruction (or some very similar instructions) is represented by a class, whose parent must be 'util.Instruction'.
-    This class must have an '__init__' method, where an attribute called 'opcodes' must be created:
+    This class must have an '__init__' method, where an attribute called 'opcodes' must be created. This method is
+     called once, when the class is registered, with the class itself as 'self', so 'opcodes' becomes a class attribute.
+     Alternatively, 'opcodes' may be defined directly in the class body:
 
     Example:
         from ..util import Instruction
 
 
         class INSTRUCTION(Instruction):
+            __slots__ = ()  # see CONTRIBUTING.md
+
             def __init__(self):
                 self.opcodes = {
                     0x00: [
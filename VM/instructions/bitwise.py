@@ -1,4 +1,4 @@
-from ..util import Instruction, is_signed_out_of_range
+from ..util import Instruction, MAXVALS, SIGNS, SIGN_SHIFTS
 from ..misc import parity, Shift, MSB, LSB
 
 from functools import partialmethod as P
@@ -9,9 +9,6 @@ if __debug__:
     import logging
     logger = logging.getLogger(__name__)
 
-MAXVALS = [None, (1 << 8) - 1, (1 << 16) - 1, None, (1 << 32) - 1]  # MAXVALS[n] is the maximum value of an unsigned n-bit number
-SIGNS   = [None, 1 << 8 - 1, 1 << 16 - 1, None, 1 << 32 - 1]  # SIGNS[n] is the maximum absolute value of a signed n-bit number
-
 
 ####################
 # AND / OR / XOR / TEST
@@ -28,6 +25,7 @@ class BITWISE(Instruction):
 
     :param test: whether the instruction to be executed is TEST
     """
+    __slots__ = ()
 
     def __init__(self):
         self.opcodes = {
@@ -99,7 +97,7 @@ class BITWISE(Instruction):
 
         c = operation(a, b)
 
-        vm.reg.eflags.SF = (c >> (sz * 8 - 1)) & 1
+        vm.reg.eflags.SF = (c >> SIGN_SHIFTS[sz]) & 1
 
         c &= MAXVALS[sz]
 
@@ -141,7 +139,7 @@ class BITWISE(Instruction):
         a = type.get(loc, sz)
         c = operation(a, b)
 
-        vm.reg.eflags.SF = (c >> (sz * 8 - 1)) & 1
+        vm.reg.eflags.SF = (c >> SIGN_SHIFTS[sz]) & 1
 
         c &= MAXVALS[sz]
 
@@ -173,7 +171,7 @@ class BITWISE(Instruction):
 
         c = operation(a, b)
 
-        vm.reg.eflags.SF = (c >> (sz * 8 - 1)) & 1
+        vm.reg.eflags.SF = (c >> SIGN_SHIFTS[sz]) & 1
 
         c &= MAXVALS[sz]
 
@@ -210,7 +208,7 @@ class BITWISE(Instruction):
 
         c = operation(a, b)
 
-        vm.reg.eflags.SF = (c >> (sz * 8 - 1)) & 1
+        vm.reg.eflags.SF = (c >> SIGN_SHIFTS[sz]) & 1
 
         c &= MAXVALS[sz]
 
@@ -250,6 +248,7 @@ class NEGNOT(Instruction):
     Flags:
         None affected
     """
+    __slots__ = ()
 
     def __init__(self):
         self.opcodes = {
@@ -272,6 +271,8 @@ class NEGNOT(Instruction):
     def operation_neg(a, off):
         return NEGNOT.operation_not(a, off) + 1
 
+    operations = {2: operation_not.__func__, 3: operation_neg.__func__}
+
     def rm(vm, _8bit, REG: int) -> bool:
         ModRM = vm.mem.get_eip(vm.eip, 1)
         _REG = (ModRM & 0b00111000) >> 3
@@ -279,7 +280,7 @@ class NEGNOT(Instruction):
         if _REG != REG:
             return False
 
-        operation = {2: NEGNOT.operation_not, 3: NEGNOT.operation_neg}[REG]
+        operation = NEGNOT.operations[REG]
 
         sz = 1 if _8bit else vm.operand_size
 
@@ -290,12 +291,13 @@ class NEGNOT(Instruction):
         b = operation(a, sz)
 
         if operation == NEGNOT.operation_neg:
-            sign_b = (b >> (sz * 8 - 1)) & 1
+            sign_b = (b >> SIGN_SHIFTS[sz]) & 1
             vm.reg.eflags.CF = a != 0
             vm.reg.eflags.SF = sign_b
             vm.reg.eflags.ZF = b == 0
             vm.reg.eflags.PF = parity(b)
-            vm.reg.eflags.OF = is_signed_out_of_range(b, sz)
+            # only the most negative number overflows when negated
+            vm.reg.eflags.OF = a == SIGNS[sz]
             # TODO: deal with AF
             # vm.reg.efags.AF = ??
 
@@ -318,6 +320,8 @@ class NEGNOT(Instruction):
 # SAL / SAR / SHL / SHR
 ####################
 class SHIFT(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             # SHL, SHR, SAR
@@ -445,6 +449,8 @@ class SHIFT(Instruction):
 # SHRD / SHLD
 ####################
 class SHIFTD(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0x0FA4: P(self.shift, operation=Shift.SHL, cnt=Shift.C_imm8),
@@ -480,7 +486,7 @@ class SHIFTD(Instruction):
             # Bad parameters
             return True
 
-        _sign_dst = (dst >> (sz * 8 - 1)) & 1
+        _sign_dst = (dst >> SIGN_SHIFTS[sz]) & 1
 
         _src = src >> (sz * 8 - cnt)
         if operation == Shift.SHL:
@@ -493,7 +499,7 @@ class SHIFTD(Instruction):
             dst |= _src << cnt
 
         # set flags
-        sign_dst = (dst >> (sz * 8 - 1)) & 1
+        sign_dst = (dst >> SIGN_SHIFTS[sz]) & 1
         vm.reg.eflags.SF = sign_dst
         dst &= MAXVALS[sz]
         vm.reg.eflags.ZF = dst == 0
@@ -523,21 +529,23 @@ class SHIFTD(Instruction):
 # BSWAP
 ####################
 class BSWAP(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
-            0x0FC8 + i: self.bswap
+            0x0FC8 + i: P(self.bswap, reg32=i)
             for i in range(8)
         }
 
-    def bswap(vm) -> True:
+    def bswap(vm, reg32: int) -> True:
         sz = 4
 
-        reg32 = vm.opcode & 0b111
         src = vm.reg.get(reg32, sz)
 
         dest = int.from_bytes(src.to_bytes(sz, 'big'), 'little')
         vm.reg.set(reg32, sz, dest)
 
-        logger.debug('bswap %s', debug_register_operand(reg32, sz))
+        if __debug__:
+            logger.debug('bswap %s', debug_register_operand(reg32, sz))
 
         return True
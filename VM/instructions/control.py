@@ -2,18 +2,17 @@ from functools import partialmethod as P
 from unittest.mock import MagicMock
 
 from ..CPU import CPU32
-from ..util import Instruction, to_int, to_signed, byteorder
+from ..util import Instruction, byteorder, MAXVALS
 
 if __debug__:
     from ..debug import debug_operand, debug_register_operand
     import logging
     logger = logging.getLogger(__name__)
 
-MAXVALS = [None, (1 << 8) - 1, (1 << 16) - 1, None, (1 << 32) - 1]  # MAXVALS[n] is the maximum value of an unsigned n-byte number
-SIGNS   = [None, 1 << 8 - 1, 1 << 16 - 1, None, 1 << 32 - 1]  # SIGNS[n] is the maximum absolute value of a signed n-byte number
-
 
 class NOP(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0x90: self.nop,
@@ -38,27 +37,37 @@ class NOP(Instruction):
 ####################
 # JMP
 ####################
-JO   = compile('vm.reg.eflags.OF', 'o', 'eval')
-JNO  = compile('not vm.reg.eflags.OF', 'no', 'eval')
-JB   = compile('vm.reg.eflags.CF', 'b', 'eval')
-JNB  = compile('not vm.reg.eflags.CF', 'nb', 'eval')
-JZ   = compile('vm.reg.eflags.ZF', 'z', 'eval')
-JNZ  = compile('not vm.reg.eflags.ZF', 'nz', 'eval')
-JBE  = compile('vm.reg.eflags.CF or vm.reg.eflags.ZF', 'be', 'eval')
-JNBE = compile('not vm.reg.eflags.CF and not vm.reg.eflags.ZF', 'nbe', 'eval')
-JS   = compile('vm.reg.eflags.SF', 's', 'eval')
-JNS  = compile('not vm.reg.eflags.SF', 'ns', 'eval')
-JP   = compile('vm.reg.eflags.PF', 'p', 'eval')
-JNP  = compile('not vm.reg.eflags.PF', 'np', 'eval')
-JL   = compile('vm.reg.eflags.SF != vm.reg.eflags.OF', 'l', 'eval')
-JNL  = compile('vm.reg.eflags.SF == vm.reg.eflags.OF', 'nl', 'eval')
-JLE  = compile('vm.reg.eflags.ZF or vm.reg.eflags.SF != vm.reg.eflags.OF', 'le', 'eval')
-JNLE = compile('not vm.reg.eflags.ZF and vm.reg.eflags.SF == vm.reg.eflags.OF', 'nle', 'eval')
+def _condition(expression: str, name: str):
+    """
+    Compile a condition into a plain function of `vm`.
+    :param expression: The condition to evaluate.
+    :param name: The mnemonic suffix of the condition. It's stored as the file name of the function's code for debug output.
+    :return: The function.
+    """
+    return eval(compile(f'lambda vm: {expression}', name, 'eval'))
+
+
+JO   = _condition('vm.reg.eflags.OF', 'o')
+JNO  = _condition('not vm.reg.eflags.OF', 'no')
+JB   = _condition('vm.reg.eflags.CF', 'b')
+JNB  = _condition('not vm.reg.eflags.CF', 'nb')
+JZ   = _condition('vm.reg.eflags.ZF', 'z')
+JNZ  = _condition('not vm.reg.eflags.ZF', 'nz')
+JBE  = _condition('vm.reg.eflags.CF or vm.reg.eflags.ZF', 'be')
+JNBE = _condition('not vm.reg.eflags.CF and not vm.reg.eflags.ZF', 'nbe')
+JS   = _condition('vm.reg.eflags.SF', 's')
+JNS  = _condition('not vm.reg.eflags.SF', 'ns')
+JP   = _condition('vm.reg.eflags.PF', 'p')
+JNP  = _condition('not vm.reg.eflags.PF', 'np')
+JL   = _condition('vm.reg.eflags.SF != vm.reg.eflags.OF', 'l')
+JNL  = _condition('vm.reg.eflags.SF == vm.reg.eflags.OF', 'nl')
+JLE  = _condition('vm.reg.eflags.ZF or vm.reg.eflags.SF != vm.reg.eflags.OF', 'le')
+JNLE = _condition('not vm.reg.eflags.ZF and vm.reg.eflags.SF == vm.reg.eflags.OF', 'nle')
 
 JUMPS = [JO, JNO, JB, JNB, JZ, JNZ, JBE, JNBE, JS, JNS, JP, JNP, JL, JNL, JLE, JNLE]
 
-_JMP = compile('True', 'mp', 'eval')
-JCXZ = compile('not vm.reg.get(0, sz)', 'cxz', 'eval')
+_JMP = _condition('True', 'mp')
+JCXZ = _condition('not vm.reg.get(1, vm.address_size)', 'cxz')
 
 
 class JMP(Instruction):
@@ -68,6 +77,7 @@ class JMP(Instruction):
         Operation:
             EIP = memory_location
     """
+    __slots__ = ()
 
     def __init__(self):
         self.opcodes = {
@@ -96,7 +106,7 @@ class JMP(Instruction):
         d = vm.mem.get(vm.eip, sz, True)
         vm.eip += sz
 
-        if not eval(jump):
+        if not jump(vm):
             return True
             
         tmpEIP = vm.eip + d
@@ -108,7 +118,7 @@ class JMP(Instruction):
         vm.eip = tmpEIP
 
         if __debug__:
-            logger.debug('j%s rel%d 0x%08x', jump.co_filename, sz * 8, vm.eip)
+            logger.debug('j%s rel%d 0x%08x', jump.__code__.co_filename, sz * 8, vm.eip)
         
         return True
 
@@ -121,9 +131,7 @@ class JMP(Instruction):
         if R[1] == 4:  # this is jmp r/m
             type, loc = RM
 
-            tmpEIP = (type).get(loc, vm.address_size) 
-                      
-            vm.eip = tmpEIP & MAXVALS[vm.address_size]
+            vm.eip = (type).get(loc, vm.address_size)
 
             assert vm.eip < vm.mem.size
 
@@ -132,15 +140,15 @@ class JMP(Instruction):
 
             return True
         elif R[1] == 5:  # this is jmp m
-            segment_selector_address = to_int(vm.mem.get(vm.eip, vm.address_size), True)
+            segment_selector_address = vm.mem.get(vm.eip, vm.address_size, True)
             vm.eip += vm.address_size
-            offset_address = to_int(vm.mem.get(vm.eip, vm.address_size), True)
+            offset_address = vm.mem.get(vm.eip, vm.address_size, True)
             vm.eip += vm.address_size
 
             sz = 4 if vm.operand_size == 4 else 2
 
-            segment_selector = to_int(vm.mem.get(segment_selector_address, 2), True)
-            offset = to_int(vm.mem.get(offset_address, sz))
+            segment_selector = vm.mem.get(segment_selector_address, 2, True)
+            offset = vm.mem.get(offset_address, sz)
 
             tempEIP = offset
 
@@ -162,11 +170,11 @@ class JMP(Instruction):
         return False
 
     def ptr(vm: CPU32) -> True:
-        segment_selector = to_int(vm.mem.get(vm.eip, 2), True)
+        segment_selector = vm.mem.get(vm.eip, 2, True)
         vm.eip += 2
 
         sz = 4 if vm.operand_size == 4 else 2
-        offset = to_int(vm.mem.get(vm.eip, sz), True)
+        offset = vm.mem.get(vm.eip, sz, True)
         vm.eip += sz
 
         tempEIP = offset
@@ -190,6 +198,8 @@ class JMP(Instruction):
 # SETcc
 ####################
 class SETcc(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             opcode: P(self.rm8, cond=JUMPS[opcode % 0x0F90])
@@ -202,11 +212,11 @@ class SETcc(Instruction):
 
         type, loc = RM
 
-        byte = eval(cond)
+        byte = cond(vm)
         (type).set(loc, sz, byte)
 
         if __debug__:
-            logger.debug('set%s %s := %d', cond.co_filename, debug_operand(RM, sz), byte)
+            logger.debug('set%s %s := %d', cond.__code__.co_filename, debug_operand(RM, sz), byte)
 
         return True
 
@@ -215,6 +225,8 @@ class SETcc(Instruction):
 # CMOVcc
 ####################
 class CMOVCC(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             opcode: P(self.r_rm, cond=JUMPS[opcode % 0x0F40])
@@ -226,7 +238,7 @@ class CMOVCC(Instruction):
 
         RM, R = vm.process_ModRM()
 
-        if not eval(cond):
+        if not cond(vm):
             return True
 
         type, loc = RM
@@ -238,7 +250,7 @@ class CMOVCC(Instruction):
         if __debug__:
             logger.debug(
                 'cmov%s %s, %s=0x%x',
-                cond.co_filename,
+                cond.__code__.co_filename,
                 debug_operand(R, sz), debug_operand(RM, sz),
                 data
             )
@@ -250,6 +262,8 @@ class CMOVCC(Instruction):
 # BT
 ####################
 class BT(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0x0FBA: self.rm_imm,
@@ -318,6 +332,7 @@ class INT(Instruction):
     """
     Call to interrupt procedure.
     """
+    __slots__ = ()
 
     def __init__(self):
         self.opcodes = {
@@ -349,6 +364,8 @@ class CALL(Instruction):
     """
     Call a procedure.
     """
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xE8: self.rel,
@@ -369,15 +386,13 @@ class CALL(Instruction):
         if R[1] == 2:  # this is call r/m
             type, loc = RM
 
-            data = (type).get(loc, sz)
-          
-            tmpEIP = data & MAXVALS[sz]
-          
-            # TODO: check whether tmpEIP is OK
-          
+            data = (type).get(loc, sz)  # already an unsigned `sz`-byte number, no need to mask it
+
+            # TODO: check whether the new EIP is OK
+
             vm.stack_push(vm.eip)
-          
-            vm.eip = tmpEIP
+
+            vm.eip = data
 
             if __debug__:
                 logger.debug(
@@ -399,7 +414,7 @@ class CALL(Instruction):
         dest = vm.mem.get(vm.eip, sz, True)
         vm.eip += sz
 
-        tmpEIP = vm.eip + dest
+        tmpEIP = (vm.eip + dest) & MAXVALS[sz]
 
         vm.stack_push(vm.eip)
         vm.eip = tmpEIP
@@ -417,6 +432,8 @@ class RET(Instruction):
     """
     Return to calling procedure.
     """
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xC3: self.near,
@@ -432,7 +449,7 @@ class RET(Instruction):
 
     def near(vm: CPU32) -> True:
         sz = vm.operand_size
-        vm.eip = to_signed(vm.stack_pop(sz), sz)
+        vm.eip = vm.stack_pop(sz)
 
         if __debug__:
             logger.debug('ret 0x%08x', vm.eip)
@@ -443,7 +460,7 @@ class RET(Instruction):
         sz = vm.operand_size
 
         imm = vm.mem.get(vm.eip, 2)
-        vm.eip = to_signed(vm.stack_pop(sz), sz)
+        vm.eip = vm.stack_pop(sz)
 
         esp = 4
         vm.reg.set(esp, vm.stack_address_size, vm.reg.get(esp, vm.stack_address_size) + imm)
@@ -458,6 +475,8 @@ class RET(Instruction):
 # ENTER
 ####################
 class ENTER(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xC8: self.enter
@@ -477,7 +496,7 @@ class ENTER(Instruction):
         if NestingLevel == 0:
             ...
         elif NestingLevel == 1:
-            vm.stack_push(FrameTemp.to_bytes(vm.stack_address_size, byteorder))
+            vm.stack_push(FrameTemp)
         else:
             raise RuntimeError(f"Instruction 'enter {AllocSize}, {NestingLevel}' is not implemented yet")
 
@@ -494,6 +513,8 @@ class ENTER(Instruction):
 # LEAVE
 ####################
 class LEAVE(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xC9: self.leave
@@ -522,6 +543,8 @@ class LEAVE(Instruction):
 # CPUID
 ####################
 class CPUID(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0x0FA2: self.cpuid
@@ -533,7 +556,7 @@ class CPUID(Instruction):
         """
         eax, ebx, ecx, edx = 0, 3, 1, 2
         max_input_value = 0x01
-        EAX_val = vm.reg.get(eax, 4)
+        EAX_val = vm.reg.u32[eax]
 
         if EAX_val == 0x00:
             vm.reg.eax = max_input_value
@@ -568,6 +591,8 @@ class CPUID(Instruction):
 # HLT
 ####################
 class HLT(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xF4: self.hlt
@@ -12,6 +12,8 @@ if __debug__:
 
 # FLD
 class FLD(Instruction):
+    __slots__ = ()
+
     m_st = MagicMock(return_value=False)
 
     def __init__(self):
@@ -40,13 +42,22 @@ class FLD(Instruction):
         flt80 = vm.mem.get_float(loc, bits)
         vm.fpu.push(flt80)
 
-        logger.debug('fld%d 0x%08x = %s', bits // 8, loc, flt80)
+        if __debug__:
+            logger.debug('fld%d 0x%08x = %s', bits // 8, loc, flt80)
 
         return True
 
 
 # FILD
 class FILD(Instruction):
+    __slots__ = ()
+
+    sizes = {
+        (False, 0): 2,
+        (True, 0): 4,
+        (False, 5): 8
+    }
+
     def __init__(self):
         self.opcodes = {
             0xDB: P(self.m_int, is32bit=True, REG=0),
@@ -63,11 +74,7 @@ class FILD(Instruction):
         if _REG != REG:
             return False
 
-        sz = {
-            (False, 0): 2,
-            (True, 0): 4,
-            (False, 5): 8
-        }[(is32bit, REG)]
+        sz = FILD.sizes[(is32bit, REG)]
 
         RM, R = vm.process_ModRM()
         _, loc = RM
@@ -77,13 +84,16 @@ class FILD(Instruction):
         flt80 = binary80.from_int(imm)
         vm.fpu.push(flt80)
 
-        logger.debug('fild%d %d', sz * 8, imm)
+        if __debug__:
+            logger.debug('fild%d %d', sz * 8, imm)
 
         return True
 
 
 # FST / FSTP
 class FST(Instruction):
+    __slots__ = ()
+
     st = MagicMock(return_value=False)
 
     def __init__(self):
@@ -123,16 +133,20 @@ class FST(Instruction):
         vm.mem.set_float(loc, bits // 8, data)
 
         if R[1] == 2:
-            logger.debug('fst 0x%08x := %s', loc, data)
+            if __debug__:
+                logger.debug('fst 0x%08x := %s', loc, data)
         else:
             vm.fpu.pop()
-            logger.debug('fstp 0x%08x := %s', loc, data)
+            if __debug__:
+                logger.debug('fstp 0x%08x := %s', loc, data)
 
         return True
 
 
 # FIST / FISTP
 class FIST(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xDF: [
@@ -162,15 +176,19 @@ class FIST(Instruction):
 
         if REG != 2:
             vm.fpu.pop()
-            logger.debug('fistp 0x%08x := %d', loc, SRC)
+            if __debug__:
+                logger.debug('fistp 0x%08x := %d', loc, SRC)
         else:
-            logger.debug('fist 0x%08x := %d', loc, SRC)
+            if __debug__:
+                logger.debug('fist 0x%08x := %d', loc, SRC)
 
         return True
 
 
 # FMUL/FMULP/FIMUL
 class FMUL(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             **{
@@ -183,13 +201,16 @@ class FMUL(Instruction):
         res = vm.fpu.mul(i, 0)
         vm.fpu.pop()
 
-        logger.debug('fmulp (ST(%d) = %s)', i + 1, res)
+        if __debug__:
+            logger.debug('fmulp (ST(%d) = %s)', i + 1, res)
 
         return True
 
 
 # FADDP
 class FADDP(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             **{
@@ -201,7 +222,8 @@ class FADDP(Instruction):
     def faddp(vm, i: int) -> True:
         res = vm.fpu.add(i, 0)
 
-        logger.debug('faddp ST(%d), ST(0) (ST(%d) := %s)', i, i + 1, res)
+        if __debug__:
+            logger.debug('faddp ST(%d), ST(0) (ST(%d) := %s)', i, i + 1, res)
 
         vm.fpu.pop()
 
@@ -210,6 +232,8 @@ class FADDP(Instruction):
 
 # FDIV/FDIVP
 class FDIV(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             **{
@@ -236,10 +260,12 @@ class FDIV(Instruction):
         """
         if reverse:
             res = vm.fpu.div(0, i)
-            logger.debug('fdiv ST(0), ST(%d) (ST(0) := %s)', i, res)
+            if __debug__:
+                logger.debug('fdiv ST(0), ST(%d) (ST(0) := %s)', i, res)
         else:
             res = vm.fpu.div(i, 0)
-            logger.debug('fdiv ST(%d), ST(0) (ST(%d) := %s)', i, i, res)
+            if __debug__:
+                logger.debug('fdiv ST(%d), ST(0) (ST(%d) := %s)', i, i, res)
 
         return True
 
@@ -247,13 +273,16 @@ class FDIV(Instruction):
         res = vm.fpu.div(i, 0)
         vm.fpu.pop()
 
-        logger.debug('fdivp ST(%d), ST(0) (ST(%d) := %s)', i, i + 1, res)
+        if __debug__:
+            logger.debug('fdivp ST(%d), ST(0) (ST(%d) := %s)', i, i + 1, res)
 
         return True
 
 
 # FUCOM/FUCOMP/FUCOMPP/FCOMI/FCOMIP/FUCOMIP/FUCOMIPP
 class FCOMP(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             # F*COM*
@@ -344,6 +373,8 @@ class FCOMP(Instruction):
 
 # FLDCW
 class FLDCW(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xD9: self.m2byte
@@ -362,13 +393,16 @@ class FLDCW(Instruction):
         control = vm.mem.get(loc, 2)
         vm.fpu.control.value = control
 
-        logger.debug('fldcw 0x%08x := %04x', loc, control)
+        if __debug__:
+            logger.debug('fldcw 0x%08x := %04x', loc, control)
 
         return True
 
 
 # FSTCW/FNSTCW
 class FSTCW(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xD9: P(self.m2byte, check=False),
@@ -389,15 +423,19 @@ class FSTCW(Instruction):
 
         if check:
             # TODO: add check? WTF?
-            logger.debug('fstcw 0x%08x := %02x', loc, vm.fpu.control.value)
+            if __debug__:
+                logger.debug('fstcw 0x%08x := %02x', loc, vm.fpu.control.value)
         else:
-            logger.debug('fnstcw 0x%08x := %02x', loc,  vm.fpu.control.value)
+            if __debug__:
+                logger.debug('fnstcw 0x%08x := %02x', loc,  vm.fpu.control.value)
 
         return True
 
 
 # FXCH
 class FXCH(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xD9C8 + i: P(self.fxch, i=i)
@@ -411,6 +449,7 @@ class FXCH(Instruction):
 
         vm.fpu.status.C1 = 0
 
-        logger.debug('fxch ST(%d)', i)
+        if __debug__:
+            logger.debug('fxch ST(%d)', i)
 
         return True
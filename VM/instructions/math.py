@@ -1,6 +1,6 @@
 import enum
 
-from ..util import Instruction
+from ..util import Instruction, MAXVALS, SIGN_SHIFTS, to_signed
 from ..misc import parity, sign_extend
 
 from functools import partialmethod as P
@@ -10,13 +10,62 @@ if __debug__:
     import logging
     logger = logging.getLogger(__name__)
 
-MAXVALS = [None, (1 << 8) - 1, (1 << 16) - 1, None, (1 << 32) - 1]  # MAXVALS[n] is the maximum value of an unsigned n-bit number
-SIGNS   = [None, 1 << 8 - 1, 1 << 16 - 1, None, 1 << 32 - 1]  # SIGNS[n] is the maximum absolute value of a signed n-bit number
-
 
 ####################
 # ADD / SUB / CMP / ADC / SBB
 ####################
+def _add(eflags, a: int, b: int, sz: int) -> int:
+    """
+    Compute `a + b` and set OF, CF, AF, SF, ZF and PF accordingly.
+    :param eflags: The flags register to update.
+    :param sz: The size of the operands in bytes.
+    :return: The `sz`-byte result.
+    """
+    c = a + b
+
+    sign_a = (a >> SIGN_SHIFTS[sz]) & 1
+    sign_b = (b >> SIGN_SHIFTS[sz]) & 1
+    sign_c = (c >> SIGN_SHIFTS[sz]) & 1
+
+    eflags.OF = (sign_a == sign_b) and (sign_a != sign_c)
+    eflags.CF = c > MAXVALS[sz]
+    eflags.AF = ((a & 255) + (b & 255)) > MAXVALS[1]
+
+    c &= MAXVALS[sz]
+
+    eflags.SF = sign_c
+    eflags.ZF = c == 0
+    eflags.PF = parity(c)
+
+    return c
+
+
+def _sub(eflags, a: int, b: int, sz: int) -> int:
+    """
+    Compute `a - b` and set OF, CF, AF, SF, ZF and PF accordingly.
+    :param eflags: The flags register to update.
+    :param sz: The size of the operands in bytes.
+    :return: The `sz`-byte result.
+    """
+    c = a + MAXVALS[sz] + 1 - b
+
+    sign_a = (a >> SIGN_SHIFTS[sz]) & 1
+    sign_b = (b >> SIGN_SHIFTS[sz]) & 1
+    sign_c = (c >> SIGN_SHIFTS[sz]) & 1
+
+    eflags.OF = (sign_a != sign_b) and (sign_a != sign_c)
+    eflags.CF = b > a
+    eflags.AF = (b & 255) > (a & 255)
+
+    c &= MAXVALS[sz]
+
+    eflags.SF = sign_c
+    eflags.ZF = c == 0
+    eflags.PF = parity(c)
+
+    return c
+
+
 class ADDSUB_operation(enum.IntFlag):
     ADD = 0
     ADC = 2
@@ -33,16 +82,18 @@ class ADDSUB(Instruction):
 
     Operation: c <- a [op] b
 
-    :param sub: indicates whether the instruction to be executed is SUB. If False, ADD is executed.
+    The `*_add` implementations execute ADD and ADC, the `*_sub` ones execute SUB, CMP and SBB.
+
     :param cmp: indicates whether the instruction to be executed is CMP.
-    :param carry: indicates whether the instruction to be executed is ADC or SBB. Must be combined with the `sub` parameter.
+    :param carry: indicates whether the instruction to be executed is ADC or SBB.
     """
+    __slots__ = ()
 
     def __init__(self):
         self.opcodes = {
             # ADD
-            0x04: P(self.r_imm, _8bit=True,  sub=False, cmp=False, carry=False),
-            0x05: P(self.r_imm, _8bit=False, sub=False, cmp=False, carry=False),
+            0x04: P(self.r_imm_add, _8bit=True,  carry=False),
+            0x05: P(self.r_imm_add, _8bit=False, carry=False),
 
             0x80: [
                 P(self.rm_imm, _8bit_op=1, _8bit_imm=1, REG=0),  # ADD r/m8, imm8
@@ -66,79 +117,87 @@ class ADDSUB(Instruction):
                 P(self.rm_imm, _8bit_op=0, _8bit_imm=1, REG=3),  # SBB r/m, imm8
                 ],
 
-            0x00: P(self.rm_r, _8bit=True,  sub=False, cmp=False, carry=False),
-            0x01: P(self.rm_r, _8bit=False, sub=False, cmp=False, carry=False),
-            0x02: P(self.r_rm, _8bit=True,  sub=False, cmp=False, carry=False),
-            0x03: P(self.r_rm, _8bit=False, sub=False, cmp=False, carry=False),
+            0x00: P(self.rm_r_add, _8bit=True,  carry=False),
+            0x01: P(self.rm_r_add, _8bit=False, carry=False),
+            0x02: P(self.r_rm_add, _8bit=True,  carry=False),
+            0x03: P(self.r_rm_add, _8bit=False, carry=False),
 
             # SUB
-            0x2C: P(self.r_imm, _8bit=True,  sub=True, cmp=False, carry=False),
-            0x2D: P(self.r_imm, _8bit=False, sub=True, cmp=False, carry=False),
+            0x2C: P(self.r_imm_sub, _8bit=True,  cmp=False, carry=False),
+            0x2D: P(self.r_imm_sub, _8bit=False, cmp=False, carry=False),
 
-            0x28: P(self.rm_r, _8bit=True,  sub=True, cmp=False, carry=False),
-            0x29: P(self.rm_r, _8bit=False, sub=True, cmp=False, carry=False),
-            0x2A: P(self.r_rm, _8bit=True,  sub=True, cmp=False, carry=False),
-            0x2B: P(self.r_rm, _8bit=False, sub=True, cmp=False, carry=False),
+            0x28: P(self.rm_r_sub, _8bit=True,  cmp=False, carry=False),
+            0x29: P(self.rm_r_sub, _8bit=False, cmp=False, carry=False),
+            0x2A: P(self.r_rm_sub, _8bit=True,  cmp=False, carry=False),
+            0x2B: P(self.r_rm_sub, _8bit=False, cmp=False, carry=False),
 
             # CMP
-            0x3C: P(self.r_imm, _8bit=True,  sub=True, cmp=True, carry=False),
-            0x3D: P(self.r_imm, _8bit=False, sub=True, cmp=True, carry=False),
+            0x3C: P(self.r_imm_sub, _8bit=True,  cmp=True, carry=False),
+            0x3D: P(self.r_imm_sub, _8bit=False, cmp=True, carry=False),
 
-            0x38: P(self.rm_r, _8bit=True,  sub=True, cmp=True, carry=False),
-            0x39: P(self.rm_r, _8bit=False, sub=True, cmp=True, carry=False),
-            0x3A: P(self.r_rm, _8bit=True,  sub=True, cmp=True, carry=False),
-            0x3B: P(self.r_rm, _8bit=False, sub=True, cmp=True, carry=False),
+            0x38: P(self.rm_r_sub, _8bit=True,  cmp=True, carry=False),
+            0x39: P(self.rm_r_sub, _8bit=False, cmp=True, carry=False),
+            0x3A: P(self.r_rm_sub, _8bit=True,  cmp=True, carry=False),
+            0x3B: P(self.r_rm_sub, _8bit=False, cmp=True, carry=False),
 
             # ADC
-            0x14: P(self.r_imm, _8bit=True,  sub=False, cmp=False, carry=True),
-            0x15: P(self.r_imm, _8bit=False, sub=False, cmp=False, carry=True),
+            0x14: P(self.r_imm_add, _8bit=True,  carry=True),
+            0x15: P(self.r_imm_add, _8bit=False, carry=True),
 
-            0x10: P(self.rm_r, _8bit=True,  sub=False, cmp=False, carry=True),
-            0x11: P(self.rm_r, _8bit=False, sub=False, cmp=False, carry=True),
-            0x12: P(self.r_rm, _8bit=True,  sub=False, cmp=False, carry=True),
-            0x13: P(self.r_rm, _8bit=False, sub=False, cmp=False, carry=True),
+            0x10: P(self.rm_r_add, _8bit=True,  carry=True),
+            0x11: P(self.rm_r_add, _8bit=False, carry=True),
+            0x12: P(self.r_rm_add, _8bit=True,  carry=True),
+            0x13: P(self.r_rm_add, _8bit=False, carry=True),
 
             # SBB
-            0x1C: P(self.r_imm, _8bit=True,  sub=True, cmp=False, carry=True),
-            0x1D: P(self.r_imm, _8bit=False, sub=True, cmp=False, carry=True),
+            0x1C: P(self.r_imm_sub, _8bit=True,  cmp=False, carry=True),
+            0x1D: P(self.r_imm_sub, _8bit=False, cmp=False, carry=True),
 
-            0x18: P(self.rm_r, _8bit=True,  sub=True, cmp=False, carry=True),
-            0x19: P(self.rm_r, _8bit=False, sub=True, cmp=False, carry=True),
-            0x1A: P(self.r_rm, _8bit=True,  sub=True, cmp=False, carry=True),
-            0x1B: P(self.r_rm, _8bit=False, sub=True, cmp=False, carry=True),
+            0x18: P(self.rm_r_sub, _8bit=True,  cmp=False, carry=True),
+            0x19: P(self.rm_r_sub, _8bit=False, cmp=False, carry=True),
+            0x1A: P(self.r_rm_sub, _8bit=True,  cmp=False, carry=True),
+            0x1B: P(self.r_rm_sub, _8bit=False, cmp=False, carry=True),
             }
 
-    def r_imm(vm, _8bit, sub: bool, cmp: bool, carry: bool) -> True:
+    def r_imm_add(vm, _8bit, carry: bool) -> True:
         sz = 1 if _8bit else vm.operand_size
 
         b = vm.mem.get(vm.eip, sz)
         vm.eip += sz
 
+        a = vm.reg.get(0, sz)
+
         if carry:
             b += vm.reg.eflags.CF
 
-        a = vm.reg.get(0, sz)
+        c = _add(vm.reg.eflags, a, b, sz)
 
-        c = a + (b if not sub else MAXVALS[sz] + 1 - b)
+        vm.reg.set(0, sz, c)
 
-        sign_a = (a >> (sz * 8 - 1)) & 1
-        sign_b = (b >> (sz * 8 - 1)) & 1
-        sign_c = (c >> (sz * 8 - 1)) & 1
+        if __debug__:
+            dbg = debug_register_operand(0, sz)
+            logger.debug(
+                '%s %s=%d, imm%d=%d (%s := %d)',
+                'adc' if carry else 'add',
+                dbg, a,
+                sz * 8, b,
+                dbg, c
+            )
 
-        if not sub:
-            vm.reg.eflags.OF = (sign_a == sign_b) and (sign_a != sign_c)
-            vm.reg.eflags.CF = c > MAXVALS[sz]
-            vm.reg.eflags.AF = ((a & 255) + (b & 255)) > MAXVALS[1]
-        else:
-            vm.reg.eflags.OF = (sign_a != sign_b) and (sign_a != sign_c)
-            vm.reg.eflags.CF = b > a
-            vm.reg.eflags.AF = (b & 255) > (a & 255)
+        return True
 
-        c &= MAXVALS[sz]
+    def r_imm_sub(vm, _8bit, cmp: bool, carry: bool) -> True:
+        sz = 1 if _8bit else vm.operand_size
 
-        vm.reg.eflags.SF = sign_c
-        vm.reg.eflags.ZF = c == 0
-        vm.reg.eflags.PF = parity(c)
+        b = vm.mem.get(vm.eip, sz)
+        vm.eip += sz
+
+        a = vm.reg.get(0, sz)
+
+        if carry:
+            b += vm.reg.eflags.CF
+
+        c = _sub(vm.reg.eflags, a, b, sz)
 
         if not cmp:
             vm.reg.set(0, sz, c)
@@ -147,7 +206,7 @@ class ADDSUB(Instruction):
             dbg = debug_register_operand(0, sz)
             logger.debug(
                 '%s %s=%d, imm%d=%d (%s := %d)',
-                ('sbb' if sub else 'adc') if carry else ('cmp' if cmp else ('sub' if sub else 'add')),
+                'sbb' if carry else ('cmp' if cmp else 'sub'),
                 dbg, a,
                 sz * 8, b,
                 dbg, c
@@ -162,7 +221,7 @@ class ADDSUB(Instruction):
         if _REG != REG:
             return False
 
-        operation = ADDSUB_operation(REG)
+        is_add = REG == 0 or REG == 2  # ADD or ADC
 
         sz = 1 if _8bit_op else vm.operand_size
         imm_sz = 1 if _8bit_imm else vm.operand_size
@@ -175,40 +234,21 @@ class ADDSUB(Instruction):
 
         b &= MAXVALS[sz]  # convert to an unsigned number; ATTENTION!
 
-        if operation == operation.ADC or operation == operation.SBB:
+        if REG == 2 or REG == 3:  # ADC or SBB
             b += vm.reg.eflags.CF
 
         a = (type).get(loc, sz)
 
-        c = a + (b if operation == operation.ADD or operation == operation.ADC else MAXVALS[sz] + 1 - b)
-
-        sign_a = (a >> (sz * 8 - 1)) & 1
-        sign_b = (b >> (sz * 8 - 1)) & 1
-        sign_c = (c >> (sz * 8 - 1)) & 1
-
-        if operation == operation.ADD or operation == operation.ADC:  # not in (operation.SBB, operation.SUB, operation.CMP):
-            vm.reg.eflags.OF = (sign_a == sign_b) and (sign_a != sign_c)
-            vm.reg.eflags.CF = c > MAXVALS[sz]
-            vm.reg.eflags.AF = ((a & 255) + (b & 255)) > MAXVALS[1]
-        else:
-            vm.reg.eflags.OF = (sign_a != sign_b) and (sign_a != sign_c)
-            vm.reg.eflags.CF = b > a
-            vm.reg.eflags.AF = (b & 255) > (a & 255)
-
-        c &= MAXVALS[sz]
-
-        vm.reg.eflags.SF = sign_c
-        vm.reg.eflags.ZF = c == 0
-        vm.reg.eflags.PF = parity(c)
+        c = (_add if is_add else _sub)(vm.reg.eflags, a, b, sz)
 
-        if operation != operation.CMP:
+        if REG != 7:  # not CMP
             (type).set(loc, sz, c)
 
         if __debug__:
             dbg = debug_operand(RM, sz)
             logger.debug(
                 '%s %s=%d, imm%d=%d (%s := %d)',
-                operation.name,
+                ADDSUB_operation(REG).name,
                 dbg, a,
                 sz * 8, b,
                 dbg, c
@@ -216,7 +256,7 @@ class ADDSUB(Instruction):
         
         return True
 
-    def rm_r(vm, _8bit, sub: bool, cmp: bool, carry: bool) -> True:
+    def rm_r_add(vm, _8bit, carry: bool) -> True:
         sz = 1 if _8bit else vm.operand_size
 
         RM, R = vm.process_ModRM()
@@ -228,26 +268,35 @@ class ADDSUB(Instruction):
         if carry:
             b += vm.reg.eflags.CF
 
-        c = a + (b if not sub else MAXVALS[sz] + 1 - b)
+        c = _add(vm.reg.eflags, a, b, sz)
 
-        sign_a = (a >> (sz * 8 - 1)) & 1
-        sign_b = (b >> (sz * 8 - 1)) & 1
-        sign_c = (c >> (sz * 8 - 1)) & 1
+        (type).set(loc, sz, c)
 
-        if not sub:
-            vm.reg.eflags.OF = (sign_a == sign_b) and (sign_a != sign_c)
-            vm.reg.eflags.CF = c > MAXVALS[sz]
-            vm.reg.eflags.AF = ((a & 255) + (b & 255)) > MAXVALS[1]
-        else:
-            vm.reg.eflags.OF = (sign_a != sign_b) and (sign_a != sign_c)
-            vm.reg.eflags.CF = b > a
-            vm.reg.eflags.AF = (b & 255) > (a & 255)
+        if __debug__:
+            dbg = debug_operand(RM, sz)
+            logger.debug(
+                '%s %s=%d, %s=%d (%s := %d)',
+                'adc' if carry else 'add',
+                dbg, a,
+                debug_operand(R, sz), b,
+                dbg, c
+            )
 
-        c &= MAXVALS[sz]
+        return True
 
-        vm.reg.eflags.SF = sign_c
-        vm.reg.eflags.ZF = c == 0
-        vm.reg.eflags.PF = parity(c)
+    def rm_r_sub(vm, _8bit, cmp: bool, carry: bool) -> True:
+        sz = 1 if _8bit else vm.operand_size
+
+        RM, R = vm.process_ModRM()
+        type, loc = RM
+
+        a = (type).get(loc, sz)
+        b = vm.reg.get(R[1], sz)
+
+        if carry:
+            b += vm.reg.eflags.CF
+
+        c = _sub(vm.reg.eflags, a, b, sz)
 
         if not cmp:
             (type).set(loc, sz, c)
@@ -256,7 +305,7 @@ class ADDSUB(Instruction):
             dbg = debug_operand(RM, sz)
             logger.debug(
                 '%s %s=%d, %s=%d (%s := %d)',
-                ('sbb' if sub else 'adc') if carry else ('cmp' if cmp else ('sub' if sub else 'add')),
+                'sbb' if carry else ('cmp' if cmp else 'sub'),
                 dbg, a,
                 debug_operand(R, sz), b,
                 dbg, c
@@ -264,7 +313,7 @@ class ADDSUB(Instruction):
 
         return True
 
-    def r_rm(vm, _8bit, sub=False, cmp=False, carry=False) -> True:
+    def r_rm_add(vm, _8bit, carry: bool) -> True:
         sz = 1 if _8bit else vm.operand_size
 
         RM, R = vm.process_ModRM()
@@ -276,26 +325,35 @@ class ADDSUB(Instruction):
         if carry:
             b += vm.reg.eflags.CF
 
-        c = a + (b if not sub else MAXVALS[sz] + 1 - b)
+        c = _add(vm.reg.eflags, a, b, sz)
 
-        sign_a = (a >> (sz * 8 - 1)) & 1
-        sign_b = (b >> (sz * 8 - 1)) & 1
-        sign_c = (c >> (sz * 8 - 1)) & 1
+        vm.reg.set(R[1], sz, c)
 
-        if not sub:
-            vm.reg.eflags.OF = (sign_a == sign_b) and (sign_a != sign_c)
-            vm.reg.eflags.CF = c > MAXVALS[sz]
-            vm.reg.eflags.AF = ((a & 255) + (b & 255)) > MAXVALS[1]
-        else:
-            vm.reg.eflags.OF = (sign_a != sign_b) and (sign_a != sign_c)
-            vm.reg.eflags.CF = b > a
-            vm.reg.eflags.AF = (b & 255) > (a & 255)
+        if __debug__:
+            dbg = debug_operand(R, sz)
+            logger.debug(
+                '%s %s=%d, %s=%d (%s := %d)',
+                'adc' if carry else 'add',
+                dbg, a,
+                debug_operand(RM, sz), b,
+                dbg, c
+            )
 
-        c &= MAXVALS[sz]
+        return True
 
-        vm.reg.eflags.SF = sign_c
-        vm.reg.eflags.ZF = c == 0
-        vm.reg.eflags.PF = parity(c)
+    def r_rm_sub(vm, _8bit, cmp: bool, carry: bool) -> True:
+        sz = 1 if _8bit else vm.operand_size
+
+        RM, R = vm.process_ModRM()
+        type, loc = RM
+
+        b = (type).get(loc, sz)
+        a = vm.reg.get(R[1], sz)
+
+        if carry:
+            b += vm.reg.eflags.CF
+
+        c = _sub(vm.reg.eflags, a, b, sz)
 
         if not cmp:
             vm.reg.set(R[1], sz, c)
@@ -304,7 +362,7 @@ class ADDSUB(Instruction):
             dbg = debug_operand(R, sz)
             logger.debug(
                 '%s %s=%d, %s=%d (%s := %d)',
-                ('sbb' if sub else 'adc') if carry else ('cmp' if cmp else ('sub' if sub else 'add')),
+                'sbb' if carry else ('cmp' if cmp else 'sub'),
                 dbg, a,
                 debug_operand(RM, sz), b,
                 dbg, c
@@ -328,12 +386,13 @@ class INCDEC(Instruction):
 
     :param dec: whether the instruction to be executed is DEC. If False, INC is executed.
     """
+    __slots__ = ()
 
     def __init__(self):
         self.opcodes = {
             # INC
             **{
-                o: P(self.r, _8bit=False, dec=False)
+                o: P(self.r, _8bit=False, loc=o & 0b111, dec=False)
                 for o in range(0x40, 0x48)
                 },
             0xFE: [
@@ -347,7 +406,7 @@ class INCDEC(Instruction):
 
             # DEC
             **{
-                o: P(self.r, _8bit=False, dec=True)
+                o: P(self.r, _8bit=False, loc=o & 0b111, dec=True)
                 for o in range(0x48, 0x50)
                 }
             }
@@ -370,9 +429,9 @@ class INCDEC(Instruction):
 
         c = a + (b if not dec else MAXVALS[sz] - 1 + b)
 
-        sign_a = (a >> (sz * 8 - 1)) & 1
-        sign_b = (b >> (sz * 8 - 1)) & 1
-        sign_c = (c >> (sz * 8 - 1)) & 1
+        sign_a = (a >> SIGN_SHIFTS[sz]) & 1
+        sign_b = (b >> SIGN_SHIFTS[sz]) & 1
+        sign_c = (c >> SIGN_SHIFTS[sz]) & 1
 
         if not dec:
             vm.reg.eflags.OF = (sign_a == sign_b) and (sign_a != sign_c)
@@ -398,18 +457,17 @@ class INCDEC(Instruction):
 
         return True
 
-    def r(vm, _8bit, dec=False) -> True:
+    def r(vm, _8bit, loc: int, dec=False) -> True:
         sz = 1 if _8bit else vm.operand_size
-        loc = vm.opcode & 0b111
 
         a = vm.reg.get(loc, sz)
         b = 1
 
         c = a + (b if not dec else MAXVALS[sz] - 1 + b)
 
-        sign_a = (a >> (sz * 8 - 1)) & 1
-        sign_b = (b >> (sz * 8 - 1)) & 1
-        sign_c = (c >> (sz * 8 - 1)) & 1
+        sign_a = (a >> SIGN_SHIFTS[sz]) & 1
+        sign_b = (b >> SIGN_SHIFTS[sz]) & 1
+        sign_c = (c >> SIGN_SHIFTS[sz]) & 1
 
         if not dec:
             vm.reg.eflags.OF = (sign_a == sign_b) and (sign_a != sign_c)
@@ -436,6 +494,8 @@ class INCDEC(Instruction):
 # MUL
 ####################
 class MUL(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xF6: P(self.mul, _8bit=True),
@@ -493,6 +553,8 @@ class MUL(Instruction):
 # DIV / IDIV
 ####################
 class DIV(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xF6: [
@@ -538,7 +600,7 @@ class DIV(Instruction):
             dividend = (high << (sz * 8)) + low
         
         if idiv:
-            dividend = sign_extend(dividend, sz * 2)
+            dividend = to_signed(dividend, sz * 2)
 
         quot, rem = dividend // divisor, dividend % divisor
 
@@ -566,6 +628,8 @@ class DIV(Instruction):
 # IMUL
 ####################
 class IMUL(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xF6  : P(self.rm, _8bit=True),
@@ -661,7 +725,7 @@ class IMUL(Instruction):
         tmp_xp = src1 * src2
 
         DEST = tmp_xp & MAXVALS[sz]
-        set_flags = sign_extend(DEST, sz) != tmp_xp
+        set_flags = to_signed(DEST, sz) != tmp_xp
 
         vm.reg.eflags.OF = vm.reg.eflags.CF = set_flags
 
@@ -1,4 +1,4 @@
-from ..util import Instruction, to_int, byteorder, SegmentRegs
+from ..util import Instruction, SegmentRegs, MAXVALS, SIGN_SHIFTS, DS, ES
 from ..misc import sign_extend, parity
 from ..CPU import CPU32
 
@@ -9,9 +9,6 @@ if __debug__:
     import logging
     logger = logging.getLogger(__name__)
 
-MAXVALS = [None, (1 << 8) - 1, (1 << 16) - 1, None, (1 << 32) - 1]  # MAXVALS[n] is the maximum value of an unsigned n-bit number
-SIGNS   = [None, 1 << 8 - 1, 1 << 16 - 1, None, 1 << 32 - 1]  # SIGNS[n] is the maximum absolute value of a signed n-bit number
-
 
 ####################
 # MOV
@@ -25,18 +22,19 @@ class MOV(Instruction):
 
     Operation: b <- a
     """
+    __slots__ = ()
 
-    _attrs_ = 'operand_size', 'mem', 'reg', 'opcode', 'GDT'
+    _attrs_ = 'operand_size', 'mem', 'reg', 'opcode', 'GDT_base', 'GDT_limit'
     _funcs_ = 'process_ModRM',
 
     def __init__(self):
         self.opcodes = {
             **{
-                o: P(self.r_imm, _8bit=True)
+                o: self.fused_r_imm(_8bit=True, r=o & 0b111)
                 for o in range(0xB0, 0xB8)
                 },
             **{
-                o: P(self.r_imm, _8bit=False)
+                o: self.fused_r_imm(_8bit=False, r=o & 0b111)
                 for o in range(0xB8, 0xC0)
                 },
             0xC6: P(self.rm_imm, _8bit=True),
@@ -58,20 +56,39 @@ class MOV(Instruction):
             0xA3: P(self.r_moffs, reverse=True, _8bit=False),
             }
 
-    def r_imm(vm: CPU32, _8bit) -> True:
-        sz = 1 if _8bit else vm.operand_size
+    @staticmethod
+    def fused_r_imm(_8bit: bool, r: int):
+        """
+        Build the implementation of MOV r, imm for one particular register.
+        This is one of the most frequent instructions, so the register and, if possible, the operand size
+         are baked into a closure instead of being passed on every call.
+        """
+        if _8bit:
+            def r_imm(vm: CPU32) -> True:
+                imm = vm.mem.get_eip(vm.eip, 1)
+                vm.eip += 1
 
-        imm = vm.mem.get_eip(vm.eip, sz)
+                vm.reg.set(r, 1, imm)
 
-        vm.eip += sz
+                if __debug__:
+                    logger.debug('mov %s, %x', debug_register_operand(r, 1), imm)
 
-        r = vm.opcode & 0b111
-        vm.reg.set(r, sz, imm)
+                return True
+        else:
+            def r_imm(vm: CPU32) -> True:
+                sz = vm.operand_size
 
-        if __debug__:
-            logger.debug('mov %s, %x', debug_operand((vm.reg, r), sz), imm)
+                imm = vm.mem.get_eip(vm.eip, sz)
+                vm.eip += sz
 
-        return True
+                vm.reg.set(r, sz, imm)
+
+                if __debug__:
+                    logger.debug('mov %s, %x', debug_register_operand(r, sz), imm)
+
+                return True
+
+        return r_imm
 
     def rm_imm(vm: CPU32, _8bit) -> bool:
         sz = 1 if _8bit else vm.operand_size
@@ -169,14 +186,17 @@ class MOV(Instruction):
 
         if not reverse:
             if __debug__:
-                logger.debug(f'About to move to sreg({SegmentRegs(R[1]).name}) from index={index}, table={["GDT", "LDT"][TI]}, privilege={RPL}')
+                logger.debug(
+                    'About to move to sreg(%s) from index=%d, table=%s, privilege=%d',
+                    SegmentRegs(R[1]).name, index, ('GDT', 'LDT')[TI], RPL
+                )
 
             if TI == 0:  # move from GDT
-                descr = vm.GDT[index]
+                base, limit = vm.GDT_base[index], vm.GDT_limit[index]
             else:  # move from LDT
                 raise RuntimeError('LDT not implemented')
 
-            vm.sreg.set(R[1], SRC, descr)
+            vm.sreg.set(R[1], SRC, base, limit)
         else:
             raise RuntimeError('mov r/m, sreg is not supported yet')
 
@@ -190,6 +210,7 @@ class MOVSX(Instruction):
     """
     Move and sign extend
     """
+    __slots__ = ()
 
     _attrs_ = 'reg', 'operand_size',
     _funcs_ = 'process_ModRM',
@@ -257,11 +278,12 @@ class PUSH(Instruction):
     """
     Push data onto the stack.
     """
+    __slots__ = ()
 
     def __init__(self):
         self.opcodes = {
             **{
-                o: self.r
+                o: self.fused_r(loc=o & 0b111)
                 for o in range(0x50, 0x58)
                 },
             0xFF  : self.rm,
@@ -278,18 +300,24 @@ class PUSH(Instruction):
             0x0FA8: P(self.sreg, 'GS')
             }
 
-    def r(vm: CPU32) -> True:
-        sz = vm.operand_size
+    @staticmethod
+    def fused_r(loc: int):
+        """
+        Build the implementation of PUSH r for one particular register.
+        """
+        def r(vm: CPU32) -> True:
+            sz = vm.operand_size
 
-        loc = vm.opcode & 0b111
-        data = vm.reg.get(loc, sz)
+            data = vm.reg.get(loc, sz)
 
-        vm.stack_push(data)
+            vm.stack_push(data)
 
-        if __debug__:
-            logger.debug('push %s=0x%x', debug_register_operand(loc, sz), data)
+            if __debug__:
+                logger.debug('push %s=0x%x', debug_register_operand(loc, sz), data)
 
-        return True
+            return True
+
+        return r
 
     def rm(vm: CPU32) -> bool:
         old_eip = vm.eip
@@ -345,6 +373,8 @@ class PUSHF(Instruction):
     pushes the lower 16 bits of the EFLAGS register (that is, the FLAGS register) onto the stack.
     These instructions reverse the operation of the POPF/POPFD instructions.
     """
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0x9C: self.pushf
@@ -367,6 +397,8 @@ class PUSHF(Instruction):
 # PUSHA / PUSHAD
 ####################
 class PUSHA(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0x60: self.pusha
@@ -396,6 +428,8 @@ class PUSHA(Instruction):
 # POPA / POPAD
 ####################
 class POPA(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0x61: self.popa
@@ -406,13 +440,14 @@ class POPA(Instruction):
         regs_to_pop_2 = 3, 2, 1, 0
 
         for reg in regs_to_pop_1:
-            vm.reg.set(reg, vm.stack_pop(vm.operand_size))
+            vm.reg.set(reg, vm.operand_size, vm.stack_pop(vm.operand_size))
 
-        esp = to_int(vm.reg.get(4, vm.operand_size))
-        vm.reg.set(4, (esp + vm.operand_size).to_bytes(4, byteorder))
+        # skip the saved ESP
+        esp = vm.reg.get(4, vm.stack_address_size)
+        vm.reg.set(4, vm.stack_address_size, esp + vm.operand_size)
 
         for reg in regs_to_pop_2:
-            vm.reg.set(reg, vm.stack_pop(vm.operand_size))
+            vm.reg.set(reg, vm.operand_size, vm.stack_pop(vm.operand_size))
 
         if __debug__:
             logger.debug('popa%s', 'd' if vm.operand_size == 4 else '')
@@ -430,6 +465,8 @@ class POPF(Instruction):
     stores it in the lower 16 bits of the EFLAGS register (that is, the FLAGS register). These instructions reverse
     the operation of the PUSHF/PUSHFD/PUSHFQ instructions.
     """
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0x9D: self.popf
@@ -455,11 +492,12 @@ class POP(Instruction):
     """
     Pop data from the stack.
     """
+    __slots__ = ()
 
     def __init__(self):
         self.opcodes = {
             **{
-                o: self.r
+                o: self.fused_r(loc=o & 0b111)
                 for o in range(0x58, 0x60)
                 },
             0x8F  : self.rm,
@@ -472,17 +510,23 @@ class POP(Instruction):
             0x0FA9: P(self.sreg, 'GS', _32bit=True)
             }
 
-    def r(vm: CPU32) -> True:
-        sz = vm.operand_size
+    @staticmethod
+    def fused_r(loc: int):
+        """
+        Build the implementation of POP r for one particular register.
+        """
+        def r(vm: CPU32) -> True:
+            sz = vm.operand_size
 
-        loc = vm.opcode & 0b111
-        data = vm.stack_pop(sz)
-        vm.reg.set(loc, sz, data)
+            data = vm.stack_pop(sz)
+            vm.reg.set(loc, sz, data)
 
-        if __debug__:
-            logger.debug('pop %s := %x', debug_register_operand(loc, sz), data)
+            if __debug__:
+                logger.debug('pop %s := %x', debug_register_operand(loc, sz), data)
 
-        return True
+            return True
+
+        return r
 
     def rm(vm: CPU32) -> bool:
         sz = vm.operand_size
@@ -512,9 +556,10 @@ class POP(Instruction):
 
         data = vm.stack_pop(sz)
 
-        setattr(vm.reg, reg, to_int(data, False))
+        setattr(vm.reg, reg, data)
 
-        logger.debug('pop %s := %s', reg, data.hex())
+        if __debug__:
+            logger.debug('pop %s := 0x%x', reg, data)
 
         return True
 
@@ -523,6 +568,8 @@ class POP(Instruction):
 # LEA
 ####################
 class LEA(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0x8D: self.r_rm
@@ -564,19 +611,20 @@ class LEA(Instruction):
 # XCHG
 ####################
 class XCHG(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             **{
-                o: self.eax_r
+                o: P(self.eax_r, loc=o & 0b111)
                 for o in range(0x90, 0x98)
                 },
             0x86: P(self.rm_r, _8bit=True),
             0x87: P(self.rm_r, _8bit=False)
             }
 
-    def eax_r(vm: CPU32) -> True:
+    def eax_r(vm: CPU32, loc: int) -> True:
         sz = vm.operand_size
-        loc = vm.opcode & 0b111
 
         if loc != 0:  # not EAX
             eax_val = vm.reg.get(0, sz)
@@ -622,6 +670,8 @@ class XCHG(Instruction):
 # CMPXCHG
 ####################
 class CMPXCHG(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0x0FB0: P(self.rm_r, _8bit=True),
@@ -640,9 +690,9 @@ class CMPXCHG(Instruction):
         # BEGIN compare a and b
         c = a + MAXVALS[sz] + 1 - b
 
-        sign_a = (a >> (sz * 8 - 1)) & 1
-        sign_b = (b >> (sz * 8 - 1)) & 1
-        sign_c = (c >> (sz * 8 - 1)) & 1
+        sign_a = (a >> SIGN_SHIFTS[sz]) & 1
+        sign_b = (b >> SIGN_SHIFTS[sz]) & 1
+        sign_c = (c >> SIGN_SHIFTS[sz]) & 1
 
         vm.reg.eflags.OF = (sign_a != sign_b) and (sign_a != sign_c)
         vm.reg.eflags.CF = b > a
@@ -677,6 +727,8 @@ class CMPXCHG(Instruction):
 # CBW / CWDE
 ####################
 class CBW(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0x98: self.cbwcwde
@@ -695,6 +747,8 @@ class CBW(Instruction):
 # CMC
 ####################
 class CMC(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xF5: self.cmc
@@ -713,6 +767,8 @@ class CMC(Instruction):
 # MOVS
 ####################
 class MOVS(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xA4: P(self.movs, _8bit=True),
@@ -728,10 +784,10 @@ class MOVS(Instruction):
         esi_init = esi
 
         old_override = vm.mem.segment_override
-        vm.mem.segment_override = SegmentRegs.DS
+        vm.mem.segment_override = DS
         esi_mem = vm.mem.get(esi, sz)
 
-        vm.mem.segment_override = SegmentRegs.ES
+        vm.mem.segment_override = ES
         vm.mem.set(edi, sz, esi_mem)
 
         vm.mem.segment_override = old_override
@@ -763,6 +819,8 @@ class MOVS(Instruction):
 # CWD / CDQ
 ####################
 class CWD(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0x99: self.cwd_cdq
@@ -786,6 +844,8 @@ class CWD(Instruction):
 # CLC / CLD / STC / STD
 ####################
 class CLC(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xF8: P(self.set_stuff, 'CF', 0),
@@ -813,6 +873,7 @@ class BitScan(Instruction):
     The bit index is an unsigned offset from bit 0 of the source operand.
     If the content of the source operand is 0, the content of the destination operand is undefined.
     """
+    __slots__ = ()
 
     def __init__(self):
         self.opcodes = {
@@ -1,4 +1,4 @@
-from ..util import Instruction, SegmentRegs
+from ..util import Instruction, MAXVALS, DS, ES
 
 from functools import partialmethod as P
 
@@ -6,14 +6,13 @@ if __debug__:
     import logging
     logger = logging.getLogger(__name__)
 
-MAXVALS = [None, (1 << 8) - 1, (1 << 16) - 1, None, (1 << 32) - 1]  # MAXVALS[n] is the maximum value of an unsigned n-bit number
-SIGNS   = [None, 1 << 8 - 1, 1 << 16 - 1, None, 1 << 32 - 1]  # SIGNS[n] is the maximum absolute value of a signed n-bit number
-
 
 ####################
 # STOSB / STOSW / STOSD
 ####################
 class STOS(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xAA: P(self.m, _8bit=True),
@@ -26,9 +25,9 @@ class STOS(Instruction):
         eax = vm.reg.get(0, sz)
         edi = vm.reg.get(7, vm.address_size)
 
-        vm.mem.segment_override = SegmentRegs.ES
+        vm.mem.segment_override = ES
         vm.mem.set(edi, sz, eax)
-        vm.mem.segment_override = SegmentRegs.DS
+        vm.mem.segment_override = DS
 
         if not vm.reg.eflags.DF:
             edi += sz
@@ -49,6 +48,8 @@ class STOS(Instruction):
 
 
 class REP(Instruction):
+    __slots__ = ()
+
     def __init__(self):
         self.opcodes = {
             0xF3: self.m
@@ -1,4 +1,5 @@
-from typing import Callable
+from io import UnsupportedOperation
+from typing import Callable, Optional
 
 from ..ctypes_types import dword as Int, udword as Uint
 
@@ -7,6 +8,23 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def _syscall_caller(function: Callable[..., int], arg_types: tuple, reg_numbers: tuple):
+    """
+    Compile a function that reads the arguments of the syscall `function` from the registers and calls it.
+    The registers and their signedness are baked into the code, so nothing has to be looked up on every call.
+    :param function: The implementation of the syscall.
+    :param arg_types: The types of the syscall's arguments: `Int` or `Uint`.
+    :param reg_numbers: The registers the arguments are passed in.
+    :return: The function of `kernel` and `reg` that executes the syscall.
+    """
+    args = ''.join(
+        f', reg.{"s32" if arg_type is Int else "u32"}[{reg}]'
+        for reg, arg_type in zip(reg_numbers, arg_types)
+    )
+
+    return eval(compile(f'lambda kernel, reg: impl(kernel{args})', function.__name__, 'eval'), {'impl': function})
+
+
 class KernelMeta(type):   
     def register(cls, syscall_number: int):
         def actually_register(function: Callable[..., int]):
@@ -23,6 +41,14 @@ class KernelMeta(type):
             
             logger.info('registering syscall 0x%02x-> %r', syscall_number, function.__name__)
             cls.syscalls[syscall_number] = function, arg_types
+
+            # Syscall numbers are small and dense, so `Kernel.syscall` can index a tuple instead of hashing.
+            # The tuple is rebuilt on every registration, which only happens at import time.
+            table = list(cls.syscall_table)
+            if syscall_number >= len(table):
+                table.extend([None] * (syscall_number + 1 - len(table)))
+            table[syscall_number] = _syscall_caller(function, arg_types, cls.reg_numbers)
+            cls.syscall_table = tuple(table)
             setattr(cls, function.__name__, function)
             
             return function       
@@ -30,12 +56,14 @@ class KernelMeta(type):
 
 
 class Kernel(metaclass=KernelMeta):
-    reg_numbers = [3, 1, 2, 6, 7]  # ebx, ecx, edx, esi, edi
+    reg_numbers = 3, 1, 2, 6, 7  # ebx, ecx, edx, esi, edi
     syscalls = {}
+    syscall_table = ()  # syscall_table[syscall_number] == compiled caller of the syscall or None
 
     def __init__(self, cpu):
         self.cpu = cpu
         self.free_memory_blocks = []
+        self.filenos = {}  # guest file descriptor -> host file descriptor or None
         
     def __getitem__(self, syscall_number: int):
         try:
@@ -49,6 +77,48 @@ class Kernel(metaclass=KernelMeta):
         )
         return lambda: impl(self, *actual_args)
 
+    def syscall(self, syscall_number: int) -> int:
+        """
+        Execute the syscall `syscall_number` with the arguments taken from the registers.
+        This is the same as `self[syscall_number]()`, but does not build a closure and a generator for every call.
+        """
+        try:
+            caller = self.syscall_table[syscall_number]
+        except IndexError:
+            caller = None
+
+        if caller is None:
+            raise KeyError(f'Syscall 0x{syscall_number:02x} not found')
+
+        return caller(self, self.cpu.reg)
+
+    def fileno(self, fd: int) -> Optional[int]:
+        """
+        Get the host file descriptor that backs the guest's descriptor `fd`.
+        The result is cached per guest descriptor, so the cache entry must be dropped when `fd` is closed or reused.
+        :param fd: The guest's file descriptor.
+        :return: The host file descriptor or None if `fd` isn't backed by one.
+        :raises IndexError: if `fd` isn't an open descriptor.
+        """
+        try:
+            return self.filenos[fd]
+        except KeyError:
+            pass
+
+        if fd < 0 or fd >= len(self.cpu.descriptors) or self.cpu.descriptors[fd] is None:
+            raise IndexError(f'Bad file descriptor: {fd}')
+
+        descriptor = self.cpu.descriptors[fd]
+
+        try:
+            fileno = descriptor.fileno()
+        except (AttributeError, UnsupportedOperation):
+            fileno = None
+
+        self.filenos[fd] = fileno
+
+        return fileno
+
     def kernel_read_string(self, address: int) -> bytes:
         return self.cpu.mem.kernel_read_string(address)
 
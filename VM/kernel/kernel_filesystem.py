@@ -1,88 +1,148 @@
+import enum
+import errno
+import heapq
 import os
-from io import UnsupportedOperation
+from struct import Struct
 
-from ..ctypes_types import udword, ctypes
 from .kernel import Kernel, Int, Uint
 
 import logging
 logger = logging.getLogger(__name__)
 
 
-class StructIovec(ctypes.LittleEndianStructure):
+# struct iovec
+# {
+#     void * iov_base; / * Starting address * /
+#     size_t iov_len; / * Number of bytes to transfer * /
+# };
+struct_iovec = Struct('<II')
+
+# The maximum number of buffers a single host `writev` accepts
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = -1
+
+if IOV_MAX <= 0:
+    IOV_MAX = 16  # the minimum allowed by POSIX
+
+
+class O_MODE(enum.IntFlag):
     """
-    struct iovec
-    {
-        void * iov_base; / * Starting address * /
-        size_t iov_len; / * Number of bytes to transfer * /
-    };
+    File access modes.
+    See: https://github.com/torvalds/linux/blob/master/include/uapi/asm-generic/fcntl.h
     """
-    _pack_ = 1
-    _fields_ = [
-        ('iov_base', udword),
-        ('iov_len', udword)
-    ]
+    O_ACCMODE = 0o00000003
+    O_RDONLY = 0o00000000
+    O_WRONLY = 0o00000001
+    O_RDWR = 0o00000002
+    O_CREAT = 0o00000100  # not fcntl
+    O_EXCL = 0o00000200  # not fcntl
+    O_NOCTTY = 0o00000400  # not fcntl
+    O_TRUNC = 0o00001000  # not fcntl
+    O_APPEND = 0o00002000
+    O_NONBLOCK = 0o00004000
+    O_DSYNC = 0o00010000  # used to be O_SYNC, see below
+    FASYNC = 0o00020000  # fcntl, for BSD compatibility
+    O_DIRECT = 0o00040000  # direct disk access hint
+    O_LARGEFILE = 0o00100000
+    O_DIRECTORY = 0o00200000  # must be a directory
+    O_NOFOLLOW = 0o00400000  # don't follow links
+    O_NOATIME = 0o01000000
+    O_CLOEXEC = 0o02000000  # set close_on_exec
+
+    _O_SYNC = 0o04000000
+    O_SYNC = (_O_SYNC | O_DSYNC)
+    O_PATH = 0o010000000
+
+    _O_TMPFILE = 0o020000000
+    # a horrid kludge trying to make sure that this will fail on old kernels
+    O_TMPFILE = (_O_TMPFILE | O_DIRECTORY)
+    O_TMPFILE_MASK = (_O_TMPFILE | O_DIRECTORY | O_CREAT)
+
+
+def _open_file(kernel: Kernel, name: str, mode: str) -> int:
+    file = open(name, mode)
+
+    if kernel.cpu.free_descriptors:
+        # reuse the lowest closed descriptor, like Linux does
+        descriptor = heapq.heappop(kernel.cpu.free_descriptors)
+        kernel.cpu.descriptors[descriptor] = file
+        kernel.filenos.pop(descriptor, None)
+    else:
+        descriptor = len(kernel.cpu.descriptors)
+        kernel.cpu.descriptors.append(file)
 
+    return descriptor
 
-@Kernel.register(0x05)
-def sys_open(kernel: Kernel, pathname_addr: Uint, flags: Int, mode: Uint):
+
+def _write_stream(descriptor, data: memoryview) -> int:
     """
-    int open(const char *pathname, int flags, mode_t mode);
+    Write `data` to a descriptor that isn't backed by a host file descriptor.
+    Text streams that wrap a binary buffer are written in binary to avoid decoding the data.
     """
+    buffer = getattr(descriptor, 'buffer', None)
+
+    if buffer is not None:
+        descriptor.flush()  # keep the data already written in text mode in order
+        ret = buffer.write(data)
+    else:
+        ret = descriptor.write(data.tobytes().decode('ascii'))
+
+    descriptor.flush()
 
-    import enum
+    return ret
 
-    class O_MODE(enum.IntFlag):
+
+if hasattr(os, 'readv'):
+    def _read_fileno(mem, fileno: int, address: int, count: int) -> int:
+        """
+        Read up to `count` bytes from the host file descriptor `fileno` straight into the guest's memory at `address`.
+        """
+        return os.readv(fileno, [mem.get_view(address, count)])
+else:
+    # `os.readv` is only available on Unix
+    def _read_fileno(mem, fileno: int, address: int, count: int) -> int:
+        """
+        Read up to `count` bytes from the host file descriptor `fileno` and copy them to the guest's memory at `address`.
+        """
+        data = os.read(fileno, count)
+        l = len(data)
+        mem.set_bytes(address, l, data)
+
+        return l
+
+
+if hasattr(os, 'writev'):
+    def _write_fileno(fileno: int, buffers: list) -> int:
         """
-        File access modes.
-        See: https://github.com/torvalds/linux/blob/master/include/uapi/asm-generic/fcntl.h
+        Write `buffers` to the host file descriptor `fileno` with as few syscalls as possible.
+        Stops at the first partial write, like `writev` itself.
         """
-        O_ACCMODE = 0o00000003
-        O_RDONLY = 0o00000000
-        O_WRONLY = 0o00000001
-        O_RDWR = 0o00000002
-        O_CREAT = 0o00000100  # not fcntl
-        O_EXCL = 0o00000200  # not fcntl
-        O_NOCTTY = 0o00000400  # not fcntl
-        O_TRUNC = 0o00001000  # not fcntl
-        O_APPEND = 0o00002000
-        O_NONBLOCK = 0o00004000
-        O_DSYNC = 0o00010000  # used to be O_SYNC, see below
-        FASYNC = 0o00020000  # fcntl, for BSD compatibility
-        O_DIRECT = 0o00040000  # direct disk access hint
-        O_LARGEFILE = 0o00100000
-        O_DIRECTORY = 0o00200000  # must be a directory
-        O_NOFOLLOW = 0o00400000  # don't follow links
-        O_NOATIME = 0o01000000
-        O_CLOEXEC = 0o02000000  # set close_on_exec
-
-        _O_SYNC = 0o04000000
-        O_SYNC = (_O_SYNC | O_DSYNC)
-        O_PATH = 0o010000000
-
-        _O_TMPFILE = 0o020000000
-        # a horrid kludge trying to make sure that this will fail on old kernels
-        O_TMPFILE = (_O_TMPFILE | O_DIRECTORY)
-        O_TMPFILE_MASK = (_O_TMPFILE | O_DIRECTORY | O_CREAT)
-
-    def open_file(name: str, mode: str):
-        # find empty descriptor, starting from 3
-        descriptor = -1
-        for descr, file in enumerate(kernel.cpu.descriptors):
-            if file is None:
-                # found empty descriptor
-                # print('found empty descriptor')
-                descriptor = descr
+        size = 0
+        for start in range(0, len(buffers), IOV_MAX):
+            batch = buffers[start:start + IOV_MAX]
+            ret = os.writev(fileno, batch)
+            size += ret
+
+            if ret < sum(len(buf) for buf in batch):
                 break
 
-        if descriptor == -1:  # no empty descriptors found
-            descriptor = len(kernel.cpu.descriptors)
-            # print(f'opening new descriptor: {descriptor}')
-            kernel.cpu.descriptors.append(open(name, mode))
-        else:
-            # print(f'reusing existing descriptor: {descriptor}')
-            kernel.cpu.descriptors[descriptor] = open(name, mode)
+        return size
+else:
+    # `os.writev` is only available on Unix
+    def _write_fileno(fileno: int, buffers: list) -> int:
+        """
+        Write `buffers` to the host file descriptor `fileno` one by one.
+        """
+        return sum(os.write(fileno, buf) for buf in buffers)
 
-        return descriptor
+
+@Kernel.register(0x05)
+def sys_open(kernel: Kernel, pathname_addr: Uint, flags: Int, mode: Uint):
+    """
+    int open(const char *pathname, int flags, mode_t mode);
+    """
 
     pathname = kernel.kernel_read_string(pathname_addr).decode()
     flags = O_MODE(flags)
@@ -93,15 +153,15 @@ def sys_open(kernel: Kernel, pathname_addr: Uint, flags: Int, mode: Uint):
         if not os.path.exists(pathname):
             return -1
 
-        descr = open_file(pathname, 'r')
+        descr = _open_file(kernel, pathname, 'r')
         logger.info('\tsys_open: [SUCC] %s descriptor %u', flags, descr)
 
         return descr
     elif flags & O_MODE.O_WRONLY:
         if flags & O_MODE.O_TRUNC:
-            descr = open_file(pathname, 'w')
+            descr = _open_file(kernel, pathname, 'w')
         else:
-            descr = open_file(pathname, 'x')
+            descr = _open_file(kernel, pathname, 'x')
 
         logger.info('\tsys_open: [SUCC] %s descriptor %u', flags, descr)
 
@@ -110,7 +170,7 @@ def sys_open(kernel: Kernel, pathname_addr: Uint, flags: Int, mode: Uint):
         if pathname == '/dev/tty':
             return 0  # TODO: what to do with TTYs?
 
-        descr = open_file(pathname, 'r+')
+        descr = _open_file(kernel, pathname, 'r+')
 
         logger.info('\tsys_open: [SUCC] %s descriptor %u', flags, descr)
 
@@ -119,7 +179,7 @@ def sys_open(kernel: Kernel, pathname_addr: Uint, flags: Int, mode: Uint):
         if pathname.startswith('/etc'):
             return -1
 
-        descr = open_file(pathname, 'r')
+        descr = _open_file(kernel, pathname, 'r')
         logger.info('\tsys_open: [SUCC] %s descriptor %u', flags, descr)
 
         return descr
@@ -146,8 +206,10 @@ def sys_close(kernel: Kernel, fd: Uint):
         logger.info('\tsys_close: [ERR] descriptor %u already closed', fd)
         return -1  # error
 
+    kernel.filenos.pop(fd, None)
     kernel.cpu.descriptors[fd].close()
     kernel.cpu.descriptors[fd] = None
+    heapq.heappush(kernel.cpu.free_descriptors, fd)
 
     logger.info('\tsys_close: [SUCC] descriptor %u closed', fd)
 
@@ -181,8 +243,32 @@ def sys_read(kernel: Kernel, fd: Uint, data_addr: Uint, count: Uint):
     logger.info('sys_read(unsigned int fd = %u, char *dest = 0x%08x, size_t count = %u)', fd, data_addr, count)
 
     try:
-        data = os.read(kernel.cpu.descriptors[fd].fileno(), count)
-    except (AttributeError, UnsupportedOperation):
+        fileno = kernel.fileno(fd)
+    except IndexError:
+        logger.info('\tsys_read: [ERR] bad file descriptor %u', fd)
+
+        return -errno.EBADF
+
+    if fileno is not None:
+        mem = kernel.cpu.mem
+        # The buffer may be larger than the memory left after it, which is fine as long as the data fits
+        count = min(count, max(mem.size - data_addr, 0))
+
+        try:
+            l = _read_fileno(mem, fileno, data_addr, count)
+        except OSError:
+            logger.error('\tsys_read: [ERR] failed to read %u bytes from descriptor %u', count, fd)
+
+            return -1
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('\tsys_read: [SUCC] read %r from fd %u', mem.get_bytes(data_addr, l), fd)
+
+        return l
+
+    try:
+        # Text streams are always read through their text layer, because it may hold data
+        # that has already been read from the underlying binary buffer
         data = (kernel.cpu.descriptors[fd].read(count) + '\n').encode('ascii')
     except:
         logger.error('\tsys_read: [ERR] failed to read %u bytes from descriptor %u', count, fd)
@@ -203,16 +289,23 @@ def sys_write(kernel: Kernel, fd: Uint, buf_addr: Uint, count: Uint):
     Arguments: (unsigned int fd, const char * buf, size_t count)
     """
 
-    buf = kernel.cpu.mem.get_bytes(buf_addr, count)
+    buf = kernel.cpu.mem.get_view(buf_addr, count)
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info('sys_write(%d, 0x%08x(%s), %d)', fd, buf_addr, buf.tobytes(), count)
 
-    logger.info('sys_write(%d, 0x%08x(%s), %d)', fd, buf_addr, buf, count)
     try:
-        fileno = kernel.cpu.descriptors[fd].fileno()
+        fileno = kernel.fileno(fd)
+    except IndexError:
+        logger.info('\tsys_write: [ERR] bad file descriptor %u', fd)
+
+        return -errno.EBADF
+
+    if fileno is not None:
         ret = os.write(fileno, buf)
         # os.fsync(fileno)
-    except (AttributeError, UnsupportedOperation):
-        ret = kernel.cpu.descriptors[fd].write(buf.decode('ascii'))
-        kernel.cpu.descriptors[fd].flush()
+    else:
+        ret = _write_stream(kernel.cpu.descriptors[fd], buf)
 
     return ret if ret is not None else count
 
@@ -234,33 +327,34 @@ def sys_writev(kernel: Kernel, fd: Int, iov_addr: Uint, iovcnt: Int):
 
     logger.info('sys_writev(fd=%d, iov=0x%x, iovcnt=%d)', fd, iov_addr, iovcnt)
 
-    size = 0
-    for x in range(iovcnt):
-        iovec = StructIovec.from_address(kernel.cpu.mem.calc_address(iov_addr))
+    mem = kernel.cpu.mem
+    iovecs = list(struct_iovec.iter_unpack(mem.get_bytes(iov_addr, iovcnt * struct_iovec.size)))
 
-        logger.info(
-            'struct iovec {\n\tvoid *iov_base=0x%08x;\n\tsize_t iov_len=%d;\n}',
-            iovec.iov_base, iovec.iov_len
-        )
+    if logger.isEnabledFor(logging.INFO):
+        for x, (iov_base, iov_len) in enumerate(iovecs):
+            logger.info(
+                'iov_%d=0x%08x; iov_len=%d, buf=%s', x, iov_base, iov_len, mem.get_bytes(iov_base, iov_len)
+            )
 
-        if not iovec.iov_len:
-            iov_addr += ctypes.sizeof(StructIovec)
-            continue
+    try:
+        fileno = kernel.fileno(fd)
+    except IndexError:
+        logger.info('\tsys_writev: [ERR] bad file descriptor %d', fd)
 
-        buf = kernel.cpu.mem.get_bytes(iovec.iov_base, iovec.iov_len)
+        return -errno.EBADF
 
-        logger.info('iov_%d=0x%08x; iov_len=%d, buf=%s', x, iovec.iov_base, iovec.iov_len, buf)
+    if fileno is None:
+        descriptor = kernel.cpu.descriptors[fd]
 
-        try:
-            ret = os.write(kernel.cpu.descriptors[fd].fileno(), buf)
-        except (AttributeError, UnsupportedOperation):
-            ret = kernel.cpu.descriptors[fd].write(buf.decode('ascii'))
-            kernel.cpu.descriptors[fd].flush()
+        size = 0
+        for iov_base, iov_len in iovecs:
+            ret = _write_stream(descriptor, mem.get_view(iov_base, iov_len))
+            size += ret if ret is not None else iov_len
 
-        size += ret if ret is not None else iovec.iov_len
-        iov_addr += ctypes.sizeof(StructIovec)  # address of the next struct!
+        return size
 
-    return size
+    # Gather the buffers into as few host syscalls as possible without copying them
+    return _write_fileno(fileno, [mem.get_view(iov_base, iov_len) for iov_base, iov_len in iovecs if iov_len])
 
 
 @Kernel.register(0x8c)
@@ -280,8 +374,13 @@ def sys_llseek(kernel: Kernel, fd: Uint, offset_high: Uint, offset_low: Uint, re
     offset = (offset_high << 32) | offset_low
 
     try:
-        descriptor = kernel.cpu.descriptors[fd].fileno()
-    except AttributeError:
+        descriptor = kernel.fileno(fd)
+    except IndexError:
+        logger.info('\tsys_llseek: [ERR] bad file descriptor %u', fd)
+
+        return -errno.EBADF
+
+    if descriptor is None:
         kernel.cpu.mem.set(result_addr, 4, 0)
         return 0
 
@@ -1,42 +1,14 @@
 from .kernel import Kernel, Int, Uint
 
-from ctypes import LittleEndianStructure, c_uint32, sizeof
+import enum
+from struct import Struct
 
 import logging
 logger = logging.getLogger(__name__)
 
 
-udword = c_uint32.__ctype_le__
-
-
-class structUserDesc(LittleEndianStructure):
-    _pack_ = 1
-    _fields_ = [
-        ('entry_number', udword),
-        ('base_addr', udword),
-        ('limit', udword),
-        ('seg_32bit', udword, 1),
-        ('contents', udword, 2),
-        ('read_exec_only', udword, 1),
-        ('limit_in_pages', udword, 1),
-        ('seg_not_present', udword, 1),
-        ('useable', udword, 1),
-
-    ]
-
-    def __str__(self):
-        return """struct user_desc {
-    unsigned int  entry_number      = 0x%08x;
-    unsigned long base_addr         = 0x%08x;
-    unsigned int  limit             = 0x%08x;
-    unsigned int  seg_32bit:1       = %u;
-    unsigned int  contents:2        = 0x%02x;
-    unsigned int  read_exec_only:1  = %u;
-    unsigned int  limit_in_pages:1  = %u;
-    unsigned int  seg_not_present:1 = %u;
-    unsigned int  useable:1         = %u;
-};""" % (self.entry_number, self.base_addr, self.limit, self.seg_32bit, self.contents,
-         self.read_exec_only, self.limit_in_pages, self.seg_not_present, self.useable)
+# entry_number, base_addr, limit and the flags word holding the bit fields of `struct user_desc`
+user_desc_struct = Struct('<4I')
 
 
 @Kernel.register(0xf3)
@@ -60,13 +32,19 @@ def sys_set_thread_area(kernel: Kernel, u_info_addr: Uint):
     };
     """
 
-    logger.info(f'sys_set_thread_area(u_info=0x%08x)', u_info_addr)
+    logger.info('sys_set_thread_area(u_info=0x%08x)', u_info_addr)
 
-    raw_data = kernel.cpu.mem.get_bytes(u_info_addr, sizeof(structUserDesc))
+    raw_data = kernel.cpu.mem.get_bytes(u_info_addr, user_desc_struct.size)
 
-    u_info = structUserDesc.from_buffer_copy(raw_data)
+    entry_number, base_addr, limit, bit_fields = user_desc_struct.unpack(raw_data)
 
-    logger.info('%s', u_info)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            '\tstruct user_desc {entry_number=0x%08x, base_addr=0x%08x, limit=0x%08x, seg_32bit=%u, contents=%u, '
+            'read_exec_only=%u, limit_in_pages=%u, seg_not_present=%u, useable=%u}',
+            entry_number, base_addr, limit, bit_fields & 1, (bit_fields >> 1) & 0b11, (bit_fields >> 3) & 1,
+            (bit_fields >> 4) & 1, (bit_fields >> 5) & 1, (bit_fields >> 6) & 1
+        )
 
     """
     A `user_desc` is considered "empty" if `read_exec_only` and
@@ -76,7 +54,7 @@ def sys_set_thread_area(kernel: Kernel, u_info_addr: Uint):
     """
 
     selector_index = 0
-    if u_info.entry_number == 0xffffffff:  # a.k.a. (unsigned int)(-1)
+    if entry_number == 0xffffffff:  # a.k.a. (unsigned int)(-1)
         """
         When set_thread_area() is passed an entry_number of -1, it searches
         for a free TLS entry.  If set_thread_area() finds a free TLS entry,
@@ -84,31 +62,15 @@ def sys_set_thread_area(kernel: Kernel, u_info_addr: Uint):
         entry was changed.
         """
 
-        from ..Registers import SegmentDescriptor
-        for selector_index, entry in enumerate(kernel.cpu.GDT[1:], 1):
-            seg_descr = SegmentDescriptor.from_buffer_copy(entry)  # segment_descriptor_struct.unpack(entry)
-
-            if seg_descr.P:  # segment present
-                continue
-
-            # BEGIN set up BASE
-            seg_descr.base_1 = u_info.base_addr & 0xFFFF
-            seg_descr.base_2 = (u_info.base_addr >> 16) & 0xFF
-            seg_descr.base_3 = (u_info.base_addr >> 24) & 0xFF
-            # END set up BASE
-
-            # BEGIN set up LIMIT
-            seg_descr.limit_1 = u_info.limit & 0xFFFF
-            seg_descr.limit_2 = (u_info.limit >> 16) & 0xF
-            # END set up LIMIT
-
-            seg_descr.P = 1  # set segment present to True
+        try:
+            selector_index = kernel.cpu.GDT_free.pop()
+        except IndexError:
+            logger.info('\tsys_set_thread_area: [ERR] no free GDT entries')
+            return -1
 
-            kernel.cpu.GDT[selector_index] = bytes(seg_descr)  # segment_descriptor_struct.pack(*descriptor)
-
-            # print(f'Written segment descriptor: {seg_descr}')
-
-            break
+        kernel.cpu.GDT_base[selector_index] = base_addr
+        kernel.cpu.GDT_limit[selector_index] = limit & 0xFFFFF
+        kernel.cpu.GDT_flags[selector_index] |= 0x80  # set segment present to True
 
     kernel.cpu.mem.set(u_info_addr, 4, selector_index)  # set address of new selector
     # return success (0) or error (-1)
@@ -187,6 +149,23 @@ def sys_brk(kernel: Kernel, brk: Uint):
     return kernel.cpu.mem.program_break
 
 
+class MAP_FLAGS(enum.Flag):
+    # see http://people.seas.harvard.edu/~apw/sreplay/src/linux/mmap.c
+    MAP_SHARED    = 0x01   # Share changes
+    MAP_PRIVATE   = 0x02   # Changes are private.
+    MAP_FIXED     = 0x10   # Interpret addr exactly.
+    MAP_FILE      = 0
+    MAP_ANONYMOUS = 0x20   # Don't use a file.
+
+
+class MAP_PROT(enum.Flag):
+    # see above
+    PROT_READ  = 0x1  # Page can be read.
+    PROT_WRITE = 0x2  # Page can be written.
+    PROT_EXEC  = 0x4  # Page can be executed.
+    PROT_NONE  = 0x0  # Page can not be accessed.
+
+
 @Kernel.register(0xc0)
 def sys_mmap(kernel: Kernel, addr: Uint, length: Uint, prot: Int, flags: Int, fd: Int):
     """
@@ -196,29 +175,12 @@ def sys_mmap(kernel: Kernel, addr: Uint, length: Uint, prot: Int, flags: Int, fd
     See: http://www.man7.org/linux/man-pages/man2/mmap2.2.html
     """
 
-    import enum
-
-    class MAP_FLAGS(enum.Flag):
-        # see http://people.seas.harvard.edu/~apw/sreplay/src/linux/mmap.c
-        MAP_SHARED    = 0x01   # Share changes
-        MAP_PRIVATE   = 0x02   # Changes are private.
-        MAP_FIXED     = 0x10   # Interpret addr exactly.
-        MAP_FILE      = 0
-        MAP_ANONYMOUS = 0x20   # Don't use a file.
-
-    class MAP_PROT(enum.Flag):
-        # see above
-        PROT_READ  = 0x1  # Page can be read.
-        PROT_WRITE = 0x2  # Page can be written.
-        PROT_EXEC  = 0x4  # Page can be executed.
-        PROT_NONE  = 0x0  # Page can not be accessed.
-
     flags = MAP_FLAGS(flags)
     prot = MAP_PROT(prot)
 
     logger.info(
         'mmap(void *addr=0x%08x, size_t length=%d, int prot=%s, int flags=%s, int fd=%d, off_t offset=%d)',
-        addr, length, str(prot), str(flags), fd, -1
+        addr, length, prot, flags, fd, -1
     )
 
     if flags & MAP_FLAGS.MAP_ANONYMOUS:
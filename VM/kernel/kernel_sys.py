@@ -1,5 +1,7 @@
+import enum
 import struct
 import ctypes
+import time
 
 from .kernel import Kernel, Uint, Int
 
@@ -31,6 +33,24 @@ class StructNewUtsname(ctypes.LittleEndianStructure):
     ]
 
 
+# The response of `sys_newuname` never changes, so it's packed only once
+UTSNAME = bytes(StructNewUtsname(
+    sysname=b'PyVM_Linux',
+    nodename=b'PyVM_Linux',
+    release=b'3.14',
+    version=b'3.14',
+    machine=b'PyVM - Intel IA-32 on Python',
+    domainname=b'PyVM_Linux.local'
+))
+
+
+# struct timespec {
+#     time_t   tv_sec;        /* seconds */
+#     long     tv_nsec;       /* nanoseconds */
+# };
+struct_timespec = struct.Struct('<II')
+
+
 @Kernel.register(0x109)
 def sys_clock_gettime(kernel: Kernel, clk_id: Uint, tp_addr: Uint):
     """
@@ -48,18 +68,88 @@ def sys_clock_gettime(kernel: Kernel, clk_id: Uint, tp_addr: Uint):
     };
     """
 
-    struct_timespec = struct.Struct('<II')
-
-    import time
-
     time_nanoseconds = int(time.time() * 1_000_000_000)  # Python 3.6 compatibility
-    sec, nsec = time_nanoseconds // 1_000_000_000, time_nanoseconds % 1_000_000_000
+    sec, nsec = divmod(time_nanoseconds, 1_000_000_000)
 
     kernel.cpu.mem.set_bytes(tp_addr, struct_timespec.size, struct_timespec.pack(sec, nsec))
 
     return 0
 
 
+directions = enum.Flag('directions', '_IOC_NONE _IOC_READ _IOC_WRITE', start=0)
+
+# TAKEN FROM: https://elixir.bootlin.com/linux/v5.0.8/source/include/uapi/asm-generic/ioctl.h
+_IOC_NRBITS   = 8
+_IOC_TYPEBITS = 8
+_IOC_SIZEBITS = 14
+_IOC_DIRBITS  = 2
+
+_IOC_NRMASK = ((1 << _IOC_NRBITS)-1)
+_IOC_TYPEMASK = ((1 << _IOC_TYPEBITS)-1)
+_IOC_SIZEMASK = ((1 << _IOC_SIZEBITS)-1)
+_IOC_DIRMASK = ((1 << _IOC_DIRBITS)-1)
+
+_IOC_NRSHIFT = 0
+_IOC_TYPESHIFT = _IOC_NRSHIFT + _IOC_NRBITS
+_IOC_SIZESHIFT = _IOC_TYPESHIFT + _IOC_TYPEBITS
+_IOC_DIRSHIFT = _IOC_SIZESHIFT + _IOC_SIZEBITS
+
+_IOC_NONE = 0
+_IOC_WRITE = 1
+_IOC_READ = 2
+
+IOC_IN = (_IOC_WRITE << _IOC_DIRSHIFT)
+IOC_OUT = (_IOC_READ << _IOC_DIRSHIFT)
+IOC_INOUT = ((_IOC_WRITE|_IOC_READ) << _IOC_DIRSHIFT)
+IOCSIZE_MASK = (_IOC_SIZEMASK << _IOC_SIZESHIFT)
+IOCSIZE_SHIFT = (_IOC_SIZESHIFT)
+
+
+def _IOC_DIR(nr: int) -> int:
+    return (nr >> _IOC_DIRSHIFT) & _IOC_DIRMASK
+
+
+def _IOC_TYPE(nr: int) -> int:
+    return (nr >> _IOC_TYPESHIFT) & _IOC_TYPEMASK
+
+
+def _IOC_NR(nr: int) -> int:
+    return (nr >> _IOC_NRSHIFT) & _IOC_NRMASK
+
+
+def _IOC_SIZE(nr: int) -> int:
+    return (nr >> _IOC_SIZESHIFT) & _IOC_SIZEMASK
+
+
+# TAKEN FROM: http://man7.org/linux/man-pages/man4/tty_ioctl.4.html
+#
+# struct winsize
+# {
+#     unsigned short ws_row;
+#     unsigned short ws_col;
+#     unsigned short ws_xpixel; / *unused * /
+#     unsigned short ws_ypixel; / *unused * /
+# };
+WINSIZE = struct.pack('<HHHH', 256, 256, 0, 0)
+
+
+def _ioctl_TIOCGWINSZ(kernel: Kernel, fd: int, data_addr: int) -> int:
+    try:
+        kernel.cpu.descriptors[fd]
+    except IndexError:
+        return -1
+
+    kernel.cpu.mem.set_bytes(data_addr, len(WINSIZE), WINSIZE)
+
+    return 0
+
+
+# Requests are dispatched on the whole request word, so it doesn't have to be decoded
+IOCTL_HANDLERS = {
+    0x00005413: _ioctl_TIOCGWINSZ,  # _IOC(_IOC_NONE, 'T', 19, 0)
+}
+
+
 @Kernel.register(0x36)
 def sys_ioctl(kernel: Kernel, fd: Int, request: Uint, data_addr: Uint):
     """
@@ -121,70 +211,19 @@ def sys_ioctl(kernel: Kernel, fd: Int, request: Uint, data_addr: Uint):
     # 0x0000545A TIOCSERGETMULTI struct serial_multiport_struct *
     # 0x0000545B TIOCSERSETMULTI const struct serial_multiport_struct *
 
-    import enum
-    directions = enum.Flag('directions', '_IOC_NONE _IOC_READ _IOC_WRITE', start=0)
-
-    # TAKEN FROM: https://elixir.bootlin.com/linux/v5.0.8/source/include/uapi/asm-generic/ioctl.h
-    _IOC_NRBITS   = 8
-    _IOC_TYPEBITS = 8
-    _IOC_SIZEBITS = 14
-    _IOC_DIRBITS  = 2
-
-    _IOC_NRMASK = ((1 << _IOC_NRBITS)-1)
-    _IOC_TYPEMASK = ((1 << _IOC_TYPEBITS)-1)
-    _IOC_SIZEMASK = ((1 << _IOC_SIZEBITS)-1)
-    _IOC_DIRMASK = ((1 << _IOC_DIRBITS)-1)
-
-    _IOC_NRSHIFT = 0
-    _IOC_TYPESHIFT = _IOC_NRSHIFT + _IOC_NRBITS
-    _IOC_SIZESHIFT = _IOC_TYPESHIFT + _IOC_TYPEBITS
-    _IOC_DIRSHIFT = _IOC_SIZESHIFT + _IOC_SIZEBITS
-
-    _IOC_NONE = 0
-    _IOC_WRITE = 1
-    _IOC_READ = 2
-
-    _IOC_DIR = lambda nr: (((nr) >> _IOC_DIRSHIFT) & _IOC_DIRMASK)
-    _IOC_TYPE = lambda nr: (((nr) >> _IOC_TYPESHIFT) & _IOC_TYPEMASK)
-    _IOC_NR = lambda nr: (((nr) >> _IOC_NRSHIFT) & _IOC_NRMASK)
-    _IOC_SIZE = lambda nr: (((nr) >> _IOC_SIZESHIFT) & _IOC_SIZEMASK)
-
-    IOC_IN = (_IOC_WRITE << _IOC_DIRSHIFT)
-    IOC_OUT = (_IOC_READ << _IOC_DIRSHIFT)
-    IOC_INOUT = ((_IOC_WRITE|_IOC_READ) << _IOC_DIRSHIFT)
-    IOCSIZE_MASK = (_IOC_SIZEMASK << _IOC_SIZESHIFT)
-    IOCSIZE_SHIFT = (_IOC_SIZESHIFT)
-
-    request_type = bytes([_IOC_TYPE(request)])
-    request_number = _IOC_NR(request)
-    request_direction = directions(_IOC_DIR(request))
-    request_size = _IOC_SIZE(request)
-
-    logger.info(f'ioctl(fd={fd},request={request:09_x} (type={request_type}, number={request_number}, direction={request_direction}, size={request_size}))')
-
-    if request_type == b'T':
-        if request_number == 19 and request_direction == directions._IOC_NONE:
-            try:
-                kernel.cpu.descriptors[fd]
-            except IndexError:
-                return kernel.cpu.__return(-1)
-
-            # TAKEN FROM: http://man7.org/linux/man-pages/man4/tty_ioctl.4.html
-            #
-            # struct winsize
-            # {
-            #     unsigned short ws_row;
-            #     unsigned short ws_col;
-            #     unsigned short ws_xpixel; / *unused * /
-            #     unsigned short ws_ypixel; / *unused * /
-            # };
-            struct_winsize = struct.Struct('<HHHH')
-
-            kernel.cpu.mem.set_bytes(data_addr, struct_winsize.size, struct_winsize.pack(256, 256, 0, 0))
-
-            return 0
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            'ioctl(fd=%d, request=%#010x (type=%r, number=%d, direction=%s, size=%d))',
+            fd, request, bytes([_IOC_TYPE(request)]), _IOC_NR(request), directions(_IOC_DIR(request)),
+            _IOC_SIZE(request)
+        )
 
-    return -1
+    handler = IOCTL_HANDLERS.get(request)
+
+    if handler is None:
+        return -1
+
+    return handler(kernel, fd, data_addr)
 
 
 @Kernel.register(0x01)
@@ -207,11 +246,16 @@ def sys_exit(kernel: Kernel, code: Int):
                 kernel.cpu.descriptors[i].close()
             kernel.cpu.descriptors[i] = None
     kernel.cpu.descriptors = list(filter(None, kernel.cpu.descriptors))
+    kernel.cpu.free_descriptors = []
+    kernel.filenos.clear()
     if closed > 0:
         logger.info('sys_exit: closed %d file descriptors', closed)
     else:
         logger.info('sys_exit: no file descriptors to be closed')
 
+    logger.info('sys_exit: clearing the GDT...')
+    kernel.cpu.GDT_reset()
+
     code &= 0o0377
     kernel.cpu.descriptors[2].write(f'[!] Process exited with code {code}\n')
     kernel.cpu.RETCODE = code
@@ -231,18 +275,9 @@ def sys_newuname(kernel: Kernel, buf_addr: Uint):
     int sys_newuname(struct new_utsname *buf);
     """
 
-    logger.debug(f'sys_newuname(struct new_utsname *buf=0x%08X)', buf_addr)
-
-    uname = StructNewUtsname(
-        sysname=b'PyVM_Linux',
-        nodename=b'PyVM_Linux',
-        release=b'3.14',
-        version=b'3.14',
-        machine=b'PyVM - Intel IA-32 on Python',
-        domainname=b'PyVM_Linux.local'
-    )
+    logger.debug('sys_newuname(struct new_utsname *buf=0x%08X)', buf_addr)
 
-    kernel.cpu.mem.set_bytes(buf_addr, ctypes.sizeof(StructNewUtsname), bytes(uname))
+    kernel.cpu.mem.set_bytes(buf_addr, len(UTSNAME), UTSNAME)
 
     return 0
 
@@ -36,13 +36,13 @@ def process_ModRM(self) -> tuple:
 
     if RM != 0b100:  # No SIB byte
         if MOD == 0b01:
-            addr = self.reg.get(RM, 4, True)
+            addr = self.reg.s32[RM]
             addr += self.mem.get_eip(self.eip, 1, True)
             self.eip += 1
 
             return (self.mem, addr), (self.reg, REG)
         if MOD == 0b10:
-            addr = self.reg.get(RM, 4, True)
+            addr = self.reg.s32[RM]
             addr += self.mem.get_eip(self.eip, 4, True)
             self.eip += 4
 
@@ -50,7 +50,7 @@ def process_ModRM(self) -> tuple:
 
         # MOD == 0b00
         if RM != 0b101:
-            addr = self.reg.get(RM, 4, True)
+            addr = self.reg.s32[RM]
 
             return (self.mem, addr), (self.reg, REG)
 
@@ -78,7 +78,7 @@ def process_ModRM(self) -> tuple:
         self.eip += 4
 
     if index != 0b100:  # if index == 0b100, there's no index
-        addr += self.reg.get(index, 4, True) << scale
+        addr += self.reg.s32[index] << scale
 
     if base == 0b101:
         if MOD == 0:
@@ -89,7 +89,7 @@ def process_ModRM(self) -> tuple:
 
     # (base != 0b101) or we dropped from the `if` clause above
 
-    addr += self.reg.get(base, 4, True)
+    addr += self.reg.s32[base]
 
     return (self.mem, addr), (self.reg, REG)
 
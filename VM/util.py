@@ -1,51 +1,33 @@
 import functools
-import os
+import itertools
 import enum
-import struct
-
-if __debug__:
-    import logging
-    logger = logging.getLogger(__name__)
-
 
 byteorder = 'little'
 SegmentRegs = enum.IntEnum('SegmentRegs', 'ES CS SS DS FS GS', start=0)  # see vol. 2A 3.1.1.3 Sreg
-segment_descriptor_struct = struct.Struct('<4B2H')  # see vol. 3A 3.4.5
-
+# The numbers of the segment registers as plain ints, which are cheaper to access than `SegmentRegs` members.
+# `SegmentRegs` is meant for debug output.
+ES, CS, SS, DS, FS, GS = range(6)
 
-def to_int(data: bytes, signed=False):
-    return int.from_bytes(data, byteorder, signed=signed)
+MAXVALS = [None, 0xFF, 0xFFFF, None, 0xFFFFFFFF]  # MAXVALS[n] is the maximum value of an unsigned n-byte number
+SIGNS = {1: 0x80, 2: 0x8000, 4: 0x80000000, 8: 0x8000000000000000}  # SIGNS[n] is the sign bit of an n-byte number
+SIGN_SHIFTS = [None, 7, 15, None, 31]  # SIGN_SHIFTS[n] is the position of the sign bit of an n-byte number
+SIGNED8 = tuple(i if i < 0x80 else i - 0x100 for i in range(0x100))  # SIGNED8[n] is the byte `n` interpreted as signed
 
 
 def to_signed(num: int, bytes: int) -> int:
-    if bytes == 1:
-        if num > 127:
-            return num - 256
-    elif bytes == 2:
-        if num > 32767:
-            return num - 65536
-    elif bytes == 4:
-        if num > 2147483647:
-            return num - 4294967296
-
-    return num
-
-
-def is_signed_out_of_range(num: int, size: int) -> bool:
     """
-    Check if the signed number `num` is out of range for signed numbers of `size` byte length.
-    :param num:
-    :param size:
-    :return:
+    Interpret the unsigned `bytes`-byte number `num` as a signed one.
+    Flipping the sign bit and subtracting its weight sign-extends the number without branching on its size.
+    :param num: The unsigned number.
+    :param bytes: The size of the number in bytes: 1, 2, 4 or 8.
+    :return: The signed number.
     """
-    if size == 1:
-        return -128 <= num <= 127
-    elif size == 2:
-        return -32_768 <= num <= 32_767
-    elif size == 4:
-        return -2_147_483_648 <= num <= 2_147_483_647
+    try:
+        sign = SIGNS[bytes]
+    except KeyError:
+        raise ValueError(f'Invalid number size: {bytes} not in (1, 2, 4, 8)') from None
 
-    raise ValueError(f'Invalid number size: {size} not in (1, 2, 4)')
+    return (num ^ sign) - sign
 
 
 class MissingOpcodeError(RuntimeError):
@@ -56,7 +38,8 @@ class InstructionMeta(type):
     """
     This metaclass simply registers all the classes that inherit from 'Instruction' (see below).
     """
-    instruction_set = set()
+    instructions = {}  # name -> class, in the order of registration
+    instruction_set = ()  # filled in by `_finalize_instructions`
 
     def __init__(cls, name, bases, dct):
         super().__init__(name, bases, dct)
@@ -64,20 +47,35 @@ class InstructionMeta(type):
         if name == 'Instruction':
             return
 
-        if __debug__:
-            logger.log(logging.NOTSET, "Registering instruction %s...", name)
-
-        if '__init__' not in dct.keys():
-            raise AttributeError("Instructions must have an '__init__' method")
+        if '__init__' not in dct and 'opcodes' not in dct:
+            raise AttributeError("Instructions must have an '__init__' method or an 'opcodes' attribute")
 
-        if cls in cls.__class__.instruction_set:
+        if name in cls.__class__.instructions:
             raise ValueError(f"Duplicate instruction: {name}")
 
-        setattr(cls, '__init__', lambda self: dct['__init__'](cls))
-        cls.__class__.instruction_set.add(cls)
+        if '__init__' in dct:
+            # `__init__` is called exactly once, on the class itself, so `opcodes` becomes a class attribute
+            # and the instructions never have to be instantiated
+            dct['__init__'](cls)
+
+        # Flatten the opcode table to (opcode, implementation) pairs,
+        # so that loading the instructions into the CPU is a single loop
+        cls.opcodes_flat = tuple(
+            (opcode, impl)
+            for opcode, implementation in cls.opcodes.items()
+            # in case one opcode represents two instructions
+            for impl in (implementation if isinstance(implementation, (list, tuple)) else (implementation, ))
+        )
 
-        if __debug__:
-            logger.log(logging.NOTSET, "\tInstruction %s registered", name)
+        cls.__class__.instructions[name] = cls
+
+
+def _finalize_instructions():
+    """
+    Freeze the registered instructions into `InstructionMeta.instruction_set`.
+    Must be called after all the instructions have been imported and before the CPU class is created.
+    """
+    InstructionMeta.instruction_set = tuple(InstructionMeta.instructions.values())
 
 
 class CPUMeta(type):
@@ -87,6 +85,7 @@ class CPUMeta(type):
     """
     
     loaded = False
+    name_counter = itertools.count()
 
     def __init__(cls, name, bases, dct):
         super().__init__(name, bases, dct)
@@ -97,17 +96,13 @@ class CPUMeta(type):
             # duplicates of opcode implementations.
             return
 
-        cls.opcodes_names = {}  # TODO: this looks ugly
-        cls.concrete_names = []
+        cls.opcodes_impls = {}
+        cls.concrete_names = set()
 
         for instruction in Instruction.instruction_set:
-            for opcode, implementation in instruction().opcodes.items():
-                if isinstance(implementation, (list, tuple)):  # in case one opcode represents two instructions
-                    for impl in implementation:
-                        CPUMeta.load_instruction(cls, instruction, opcode, impl)
-                else:
-                    CPUMeta.load_instruction(cls, instruction, opcode, implementation)
-                    
+            for opcode, implementation in instruction.opcodes_flat:
+                CPUMeta.load_instruction(cls, instruction, opcode, implementation)
+
         cls.__class__.loaded = True
 
     @staticmethod
@@ -115,35 +110,39 @@ class CPUMeta(type):
         try:
             impl_name = implementation.__name__
         except AttributeError:
-            if isinstance(implementation, functools.partialmethod):
-                rand = os.urandom(4).hex()
+            # Implementations wrapped in `functools.partialmethod` have no names of their own,
+            # so they're numbered. Unlike random names, the numbers are unique and deterministic.
+            suffix = format(next(CPUMeta.name_counter), 'x')
 
+            if isinstance(implementation, functools.partialmethod):
                 try:
-                    impl_name = f"{implementation.func.__name__}_{rand}"
+                    impl_name = f"{implementation.func.__name__}_{suffix}"
                 except AttributeError:
                     # TODO: WTF is happening here? Eg. when wrapping a MagicMock
-                    impl_name = rand
+                    impl_name = suffix
             else:
                 # TODO: WTF is happening here? Eg. with a MagicMock
-                impl_name = os.urandom(4).hex()
+                impl_name = suffix
 
         concrete_name = f"i_{instruction.__name__}_{impl_name}"
 
-        while concrete_name in cls.concrete_names:
-            concrete_name += os.urandom(4).hex()
+        if concrete_name in cls.concrete_names:
+            # the counter never repeats, so one suffix is enough to make the name unique
+            concrete_name += '_' + format(next(CPUMeta.name_counter), 'x')
 
-        cls.concrete_names.append(concrete_name)
+        cls.concrete_names.add(concrete_name)
 
         setattr(cls, concrete_name, implementation)
-        cls.opcodes_names.setdefault(opcode, []).append(concrete_name)
+        cls.opcodes_impls.setdefault(opcode, []).append(implementation)
 
 
 class Instruction(metaclass=InstructionMeta):
     """
     This class is here for convenience purposes only since it's much simpler (a.k.a. easier to type) to inherit from a class
      than to use some weird metaclass. Also, all classes inheriting this one are automagically registered by the metaclass.
+    Instructions are never instantiated, so they carry no per-instance state.
     """
-    ...
+    __slots__ = ()
 
 
 class CPU(metaclass=CPUMeta):
@@ -151,17 +150,35 @@ class CPU(metaclass=CPUMeta):
     Thanks to the metaclass, all the methods of the registered instructions that are mentioned in their 'opcodes' attribute
      become bound to this class. The methods' names are handled accordingly by the metaclass.
     """
-    __slots__ = 'instr',
-    opcodes_names = {}
-    concrete_names = []
+    __slots__ = 'instr', 'instr_0F', 'instr_ext'
+    opcodes_impls = {}
+    concrete_names = set()
 
     def __init__(self):
         """
-        This merely collects all the methods (which are now bound to the class), so that later on, 'self.instr[opcode]'
-         would be a list containing all the instructions' implementations that correspond to that opcode.
-        All the methods' names are stored in 'self._opcodes_names', which is kinda ugly, but... it works, so there's that.
+        This merely binds all the methods (which are now attributes of the class) to this instance, so that later on,
+         'self.instr[opcode]' would be a tuple of all the instructions' implementations that correspond to that opcode,
+         in the order they were registered.
+        The unbound implementations are stored in 'self.opcodes_impls' by the metaclass, so they're bound
+         through the descriptor protocol directly, without looking them up by name.
+
+        One-byte opcodes are looked up in 'self.instr', which is a plain list indexed by the opcode, so that dispatching
+         the most common instructions costs a single index operation. Two-byte opcodes starting with 0x0F are
+         looked up in the same way in 'self.instr_0F' by their second byte. Other longer opcodes live in the
+         'self.instr_ext' dict.
         """
-        self.instr = {
-            opcode: {getattr(self, name) for name in impl_names}
-            for opcode, impl_names in self.opcodes_names.items()
+        cls = type(self)
+
+        def bind(impl):
+            # same as the attribute lookup would do: objects that aren't descriptors are returned as is
+            get = getattr(type(impl), '__get__', None)
+            return impl if get is None else get(impl, self, cls)
+
+        instr = {
+            opcode: tuple(bind(impl) for impl in impls)
+            for opcode, impls in self.opcodes_impls.items()
         }
+
+        self.instr = [instr.get(opcode, ()) for opcode in range(256)]
+        self.instr_0F = [instr.get(0x0F00 | opcode, ()) for opcode in range(256)]
+        self.instr_ext = {opcode: impls for opcode, impls in instr.items() if opcode > 0xFF}
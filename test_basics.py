@@ -4,6 +4,7 @@ import os
 import VM.Memory
 import VM.Registers
 import VM.CPU
+import VM.util
 
 RUNS = 100
 MEMSZ = 64 * RUNS
@@ -29,5 +30,24 @@ class TestStack(unittest.TestCase):
                 self.assertEqual(popped, x)
 
 
+class TestUtil(unittest.TestCase):
+    def test_to_signed(self):
+        for size in (1, 2, 4, 8):
+            for x in (0, 1, 2 ** (8 * size - 1) - 1, 2 ** (8 * size - 1), 2 ** (8 * size) - 1, *os.urandom(RUNS)):
+                with self.subTest(x=x, size=size):
+                    correct = int.from_bytes(x.to_bytes(size, 'little'), 'little', signed=True)
+
+                    self.assertEqual(VM.util.to_signed(x, size), correct)
+
+        for size in (-1, 0, 3):
+            with self.subTest(size=size), self.assertRaises(ValueError):
+                VM.util.to_signed(0, size)
+
+    def test_signed8(self):
+        for x in range(256):
+            with self.subTest(x=x):
+                self.assertEqual(VM.util.SIGNED8[x], VM.util.to_signed(x, 1))
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
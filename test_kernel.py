@@ -0,0 +1,167 @@
+import unittest
+import errno
+import io
+import os
+
+import VM
+from VM.kernel.kernel_filesystem import struct_iovec, IOV_MAX
+from VM.kernel.kernel_memory import user_desc_struct
+
+
+class TestFilesystem(unittest.TestCase):
+    MEMSZ = 1024 * 64
+
+    def setUp(self):
+        self.stdin = io.StringIO()
+        self.stdout = io.StringIO()
+        self.stderr = io.StringIO()
+
+        self.vm = VM.VMKernel(self.MEMSZ, self.stdin, self.stdout, self.stderr)
+
+        read_fd, write_fd = os.pipe()
+        self.pipe_read = open(read_fd, 'rb', buffering=0)
+        self.pipe_write = open(write_fd, 'wb', buffering=0)
+
+    def tearDown(self):
+        self.stdin.close()
+        self.stdout.close()
+        self.stderr.close()
+        self.pipe_read.close()
+        self.pipe_write.close()
+
+    def add_descriptor(self, file) -> int:
+        self.vm.descriptors.append(file)
+
+        return len(self.vm.descriptors) - 1
+
+    def test_writev_fileno(self):
+        fd = self.add_descriptor(self.pipe_write)
+        mem = self.vm.mem
+
+        chunks = [b'Hello', b'', b', ', b'world!\n']
+        iov_addr, data_addr = 0, 0x100
+        for x, chunk in enumerate(chunks):
+            mem.set_bytes(data_addr, len(chunk), chunk)
+            iovec = struct_iovec.pack(data_addr, len(chunk))
+            mem.set_bytes(iov_addr + x * struct_iovec.size, struct_iovec.size, iovec)
+            data_addr += len(chunk)
+
+        correct = b''.join(chunks)
+
+        self.assertEqual(self.vm.kernel.sys_writev(fd, iov_addr, len(chunks)), len(correct))
+        self.assertEqual(self.pipe_read.read(len(correct)), correct)
+
+    def test_writev_fileno_many_buffers(self):
+        fd = self.add_descriptor(self.pipe_write)
+        mem = self.vm.mem
+
+        # more buffers than a single host `writev` accepts
+        count = IOV_MAX + 10
+        iov_addr, data_addr = 0, count * struct_iovec.size
+        correct = bytes(x & 0xFF for x in range(count))
+        mem.set_bytes(data_addr, count, correct)
+
+        for x in range(count):
+            iovec = struct_iovec.pack(data_addr + x, 1)
+            mem.set_bytes(iov_addr + x * struct_iovec.size, struct_iovec.size, iovec)
+
+        self.assertEqual(self.vm.kernel.sys_writev(fd, iov_addr, count), count)
+        self.assertEqual(self.pipe_read.read(count), correct)
+
+    def test_read_fileno(self):
+        fd = self.add_descriptor(self.pipe_read)
+        correct = b'Hello, world!\n'
+        self.pipe_write.write(correct)
+
+        self.assertEqual(self.vm.kernel.sys_read(fd, 0x100, 100), len(correct))
+        self.assertEqual(self.vm.mem.get_bytes(0x100, len(correct)), correct)
+
+    def test_read_fileno_end_of_memory(self):
+        fd = self.add_descriptor(self.pipe_read)
+        correct = b'abc'
+        self.pipe_write.write(correct)
+
+        # the requested size is larger than the memory left, but the data itself fits
+        data_addr = self.MEMSZ - 10
+        self.assertEqual(self.vm.kernel.sys_read(fd, data_addr, 100), len(correct))
+        self.assertEqual(self.vm.mem.get_bytes(data_addr, len(correct)), correct)
+
+    def test_read_text_streams(self):
+        # the first line is read by the host, so it's already buffered in the text layer of the wrapper
+        wrapper = io.TextIOWrapper(io.BytesIO(b'first\nsecond\n'), encoding='ascii')
+        wrapper.readline()
+
+        for stream in (io.StringIO('second\n'), wrapper):
+            with self.subTest(stream=stream):
+                fd = self.add_descriptor(stream)
+                correct = b'second\n\n'
+
+                self.assertEqual(self.vm.kernel.sys_read(fd, 0x100, 100), len(correct))
+                self.assertEqual(self.vm.mem.get_bytes(0x100, len(correct)), correct)
+
+    def test_bad_descriptors(self):
+        self.vm.mem.set_bytes(0x100, 3, b'abc')
+        self.vm.mem.set_bytes(0, struct_iovec.size, struct_iovec.pack(0x100, 3))
+
+        fd = self.add_descriptor(self.pipe_write)
+        self.assertEqual(self.vm.kernel.sys_close(fd), 0)
+
+        for bad_fd in (fd, len(self.vm.descriptors) + 10):
+            with self.subTest(fd=bad_fd):
+                self.assertEqual(self.vm.kernel.sys_write(bad_fd, 0x100, 3), -errno.EBADF)
+                self.assertEqual(self.vm.kernel.sys_writev(bad_fd, 0, 1), -errno.EBADF)
+                self.assertEqual(self.vm.kernel.sys_read(bad_fd, 0x100, 3), -errno.EBADF)
+
+        self.assertEqual(self.vm.kernel.sys_writev(-1, 0, 1), -errno.EBADF)
+
+    def test_write_unhashable_stream(self):
+        class UnhashableStream(io.StringIO):
+            __hash__ = None
+
+        stream = UnhashableStream()
+        fd = self.add_descriptor(stream)
+        self.vm.mem.set_bytes(0x100, 3, b'abc')
+
+        self.assertEqual(self.vm.kernel.sys_write(fd, 0x100, 3), 3)
+        self.assertEqual(stream.getvalue(), 'abc')
+
+
+class TestThreadArea(unittest.TestCase):
+    MEMSZ = 1024 * 10
+
+    def setUp(self):
+        self.stdin = io.StringIO()
+        self.stdout = io.StringIO()
+        self.stderr = io.StringIO()
+
+        self.vm = VM.VMKernel(self.MEMSZ, self.stdin, self.stdout, self.stderr)
+
+    def tearDown(self):
+        self.stdin.close()
+        self.stdout.close()
+        self.stderr.close()
+
+    def set_thread_area(self) -> int:
+        u_info_addr = 0x100
+        u_info = user_desc_struct.pack(0xffffffff, 0x200, 0xfffff, 0)
+        self.vm.mem.set_bytes(u_info_addr, len(u_info), u_info)
+
+        return self.vm.kernel.sys_set_thread_area(u_info_addr)
+
+    def test_free_entries_after_exit(self):
+        allocated = 0
+        while self.set_thread_area() == 0:
+            allocated += 1
+
+        self.assertGreater(allocated, 0)
+
+        # the next program must get a fresh GDT
+        self.vm.kernel.sys_exit(0)
+
+        for _ in range(allocated):
+            self.assertEqual(self.set_thread_area(), 0)
+        self.assertEqual(self.set_thread_area(), -1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
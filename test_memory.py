@@ -58,6 +58,31 @@ class TestMemory(unittest.TestCase):
     def test_get_32(self):
         self.do_test_get(4)
 
+    def test_get_signed(self):
+        for size in (1, 2, 4):
+            for offset in range(self.mem.size - size):
+                ret = self.mem.get(offset, size, True)
+                correct = int.from_bytes(self.random_data[offset:offset + size], 'little', signed=True)
+
+                self.assertEqual(ret, correct)
+
+                ret = self.mem.get_eip(offset, size, True)
+
+                self.assertEqual(ret, correct)
+
+    def test_kernel_read_string(self):
+        string = b'/tmp/test'
+        offset = self.MEM_SIZE // 2
+        self.mem.set_bytes(offset, len(string) + 1, string + b'\0')
+
+        self.assertEqual(self.mem.kernel_read_string(offset), string)
+        self.assertEqual(self.mem.kernel_read_string(offset, 4), string[:4])
+
+        self.mem.set_bytes(self.MEM_SIZE - 4, 4, b'abcd')
+
+        with self.assertRaises(MemoryError):
+            self.mem.kernel_read_string(self.MEM_SIZE - 4)
+
     def test_set_8(self):
         for offset in range(self.mem.size):
             correct, = os.urandom(1)